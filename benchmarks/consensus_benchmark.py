@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import TextProcessorConfig
+from src.text_processor import TextProcessor, DefaultJsonAdapter
+
+
+class PreparedResponsesClient:
+    def __init__(self, responses: list):
+        self.__responses = responses
+
+    async def get_response(self, prompt: str):
+        return self.__responses
+
+    def count_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    def get_available_token_count(self) -> int:
+        return 100_000
+
+    def with_prompt(self, prompt_instruction: str):
+        return self
+
+
+def make_responses(num_responses: int, entities: int, relations: int, data_values: int, seed: int) -> list:
+    rng = random.Random(seed)
+    classes = [f"Class{number}" for number in range(20)]
+    names = [f"Individual number {number}" for number in range(entities * 2)]
+    responses = []
+    for _ in range(num_responses):
+        chosen = rng.sample(names, entities)
+        responses.append(json.dumps({
+            'objects': [[rng.choice(classes), name, [[name, 'en'], [name.upper(), 'ru'], [name.lower(), 'kz']]]
+                        for name in chosen],
+            'object_properties': [[f"relation{rng.randrange(10)}", [rng.choice(chosen), rng.choice(chosen)]]
+                                  for _ in range(relations)],
+            'data_properties': [[f"value{rng.randrange(10)}", [rng.choice(chosen), rng.randrange(1000)]]
+                                for _ in range(data_values)],
+        }))
+    return responses
+
+
+def legacy_consensus(responses: list, threshold: int):
+    counters = {'objects': Counter(), 'object_properties': Counter(), 'data_properties': Counter()}
+    for response in responses:
+        choice = json.loads(response)
+        mapped = {'objects': {}, 'object_properties': {}, 'data_properties': {}}
+        for obj in choice['objects']:
+            mapped['objects'].setdefault(obj[0], set()).add((obj[1], tuple(tuple(label) for label in obj[2])))
+        for obj_prop in choice['object_properties']:
+            mapped['object_properties'].setdefault(obj_prop[0], set()).add((obj_prop[1][0], obj_prop[1][1]))
+        for data_prop in choice['data_properties']:
+            mapped['data_properties'].setdefault(data_prop[0], set()).add(tuple(data_prop[1]))
+        for entity_type, classes in mapped.items():
+            for class_name, entities in classes.items():
+                if class_name not in counters[entity_type]:
+                    counters[entity_type][class_name] = Counter(entities)
+                else:
+                    counters[entity_type][class_name].update(entities)
+
+    result = {'objects': {}, 'object_properties': {}, 'data_properties': {}}
+    for entity_type, classes in counters.items():
+        for class_name, entities in classes.items():
+            for entity, count in entities.items():
+                if count >= threshold:
+                    result[entity_type].setdefault(class_name, set()).add(entity)
+    return result
+
+
+def record_consensus(responses: list, threshold: int):
+    config = TextProcessorConfig(0, ['.'], threshold, 1)
+    text_processor = TextProcessor(config, PreparedResponsesClient(responses), DefaultJsonAdapter())
+
+    async def run():
+        return await text_processor.process_chunks(['chunk'])[0]
+
+    return asyncio.run(run())
+
+
+def measure(name: str, function, responses: list, threshold: int, repeats: int):
+    function(responses, threshold)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        function(responses, threshold)
+    elapsed = (time.perf_counter() - started) / repeats
+
+    tracemalloc.start()
+    result = function(responses, threshold)
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = sum(stat.size for stat in snapshot.statistics('filename'))
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    print(f"{name:<10}{elapsed * 1000:>12.1f}{peak / 1024:>14.1f}{retained / 1024:>16.1f}{blocks:>12}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the legacy dict consensus with the record consensus.")
+    parser.add_argument('--responses', type=int, default=5)
+    parser.add_argument('--entities', type=int, default=2000)
+    parser.add_argument('--relations', type=int, default=2000)
+    parser.add_argument('--data-values', type=int, default=2000)
+    parser.add_argument('--threshold', type=int, default=2)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    responses = make_responses(args.responses, args.entities, args.relations, args.data_values, args.seed)
+    print(f"{'path':<10}{'time ms':>12}{'peak KiB':>14}{'retained KiB':>16}{'blocks':>12}")
+    measure('legacy', legacy_consensus, responses, args.threshold, args.repeats)
+    measure('records', record_consensus, responses, args.threshold, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
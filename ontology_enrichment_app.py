@@ -1,13 +1,55 @@
+import time
+
+STARTED = time.perf_counter()
+
+import argparse
+import logging
+import multiprocessing
 import tkinter as tk
 
-from src.config import configure_logging, get_yaml_configs
-from src.gui.main_window import MainWindow
+from src.config import StartupConfig, configure_logging, get_yaml_configs
+from src.gui.main_window import MainWindow, load_deferred_subsystems
+from src.profiling import StartupTimer, set_profiling_overrides
+
+logger = logging.getLogger("app_logger")
+
+
+def measure_startup(root, startup_timer: StartupTimer):
+    startup_timer.mark('first idle')
+    load_deferred_subsystems(startup_timer)
+    report = startup_timer.report()
+    logger.info("Startup time:\n" + report)
+    print(report)
+    root.destroy()
 
 
 def main():
-    configure_logging(get_yaml_configs()['logging'])
+    startup_timer = StartupTimer(STARTED)
+    startup_timer.mark('imports')
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="Ontology enrichment")
+    parser.add_argument('--profile', choices=['cprofile', 'sampling', 'timers'],
+                        help="profile each run and write the results to the profiling output_dir")
+    parser.add_argument('--asyncio-debug', action='store_true',
+                        help="run the event loop in debug mode and report slow callbacks")
+    parser.add_argument('--measure-startup', action='store_true',
+                        help="print how long each startup phase takes, including the deferred imports, and exit")
+    args = parser.parse_args()
+    if args.profile or args.asyncio_debug:
+        set_profiling_overrides(enabled=True, asyncio_debug=args.asyncio_debug or None,
+                                profiler='' if args.profile == 'timers' else args.profile)
+
+    configs = get_yaml_configs()
+    configure_logging(configs['logging'])
+    startup_timer.mark('config and logging')
     root = tk.Tk()
+    startup_timer.mark('tk root')
     app = MainWindow(root)
+    startup_timer.mark('main window')
+    if args.measure_startup:
+        root.after_idle(measure_startup, root, startup_timer)
+    elif StartupConfig.from_yaml(configs['startup']).prewarm:
+        root.after_idle(app.prewarm)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -17,4 +59,4 @@ if __name__ == "__main__":
 # C:\Users\Михаил\Desktop\ontology\geo.owl
 # C:\Users\Михаил\Desktop\ontology\geoTest.owl
 # https://ru.wikipedia.org/wiki/%D0%93%D0%B5%D0%BE%D0%B3%D1%80%D0%B0%D1%84%D0%B8%D1%8F_%D0%9A%D0%B0%D0%B7%D0%B0%D1%85%D1%81%D1%82%D0%B0%D0%BD%D0%B0
-# pyinstaller --onedir -w ontology_enrichment_app.py --add-data "resources/application.yaml;resources" --add-data ".venv/Lib/site-packages/owlready2/pellet;owlready2/pellet" --hidden-import tiktoken.load --add-data ".venv/Lib/site-packages/tiktoken_ext/openai_public.py;tiktoken_ext" --icon=resources/icon.ico
+# pyinstaller --onedir -w ontology_enrichment_app.py --add-data "resources/application.yaml;resources" --add-data "resources/tiktoken_cache;resources/tiktoken_cache" --add-data ".venv/Lib/site-packages/owlready2/pellet;owlready2/pellet" --hidden-import tiktoken.load --add-data ".venv/Lib/site-packages/tiktoken_ext/openai_public.py;tiktoken_ext" --icon=resources/icon.ico
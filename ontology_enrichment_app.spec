@@ -5,7 +5,7 @@ a = Analysis(
     ['ontology_enrichment_app.py'],
     pathex=[],
     binaries=[],
-    datas=[('resources/application.yaml', 'resources'), ('.venv/Lib/site-packages/owlready2/pellet', 'owlready2/pellet'), ('.venv/Lib/site-packages/tiktoken_ext/openai_public.py', 'tiktoken_ext')],
+    datas=[('resources/application.yaml', 'resources'), ('resources/tiktoken_cache', 'resources/tiktoken_cache'), ('.venv/Lib/site-packages/owlready2/pellet', 'owlready2/pellet'), ('.venv/Lib/site-packages/tiktoken_ext/openai_public.py', 'tiktoken_ext')],
     hiddenimports=['tiktoken.load'],
     hookspath=[],
     hooksconfig={},
@@ -1,58 +1,293 @@
 import asyncio
 import logging
+import os
+from typing import Protocol
 
-from src.config import ChatGptClientConfig, TextProcessorConfig, get_yaml_configs
+from src.chunk_manifest import chunk_hash
+from src.config import ChatGptClientConfig, TextProcessorConfig, CrawlFrontierConfig, LLMClientPoolConfig, \
+    TextCacheConfig, DryRunConfig, WikiDumpConfig, CascadeConfig, get_yaml_configs
+from src.crawl_frontier import CrawlFrontier
+from src.dry_run_planner import DryRunPlanner, DryRunTier
+from src.enrichment_target import EnrichmentTarget
+from src.llm_client_pool import ChatGptClientPool
+from src.model_cascade import CascadeTier, ModelCascade
+from src.profiling import ProfilingSession, global_stage_timers, load_profiling_config
 from src.gui.state_manager import global_state_manager
-from src.repository.kb_repository import KBRepository
-from src.repository.ontology_owlready2_repository import OntologyOwlready2Repository
-from src.text_processor import ChatGptClient, TextProcessor, DefaultJsonAdapter, LLMClientProtocol
-from src.text_producer import WebScraper, FromWebScraperSource, FromNLFileSource, TextSource
+from src.result_aggregator import DocumentResultAggregator
+from src.text_processor import ChatGptClient, LLMClientProtocol
+from src.text_producer import WebScraper, FromWebScraperSource, FromNLFileSource, FromCrawlFrontierSource, \
+    CachedTextSource, TextSource
+from src.wiki_dump import WikiDumpSource
 
 logger = logging.getLogger("app_logger")
 
 
+class PlaceListener(Protocol):
+    async def place_finished(self, place: str, succeeded: bool) -> None:
+        ...
+
+
 class AppLogic:
-    __kb_repository: KBRepository
     __llm_client: LLMClientProtocol
-    __text_source: TextSource
+    __text_source: TextSource | None
 
-    def __init__(self, place_generator, prompt, onto, save_ontology_path, mode):
+    def __init__(self, place_generator_factory, targets, mode, ontology_store,
+                 place_listener: PlaceListener | None = None):
         configs = get_yaml_configs()
         logger.info(configs)
-        self.__onto = onto
-        self.__place_generator = place_generator
-        self.__prompt = prompt
-        self.__kb_repository = OntologyOwlready2Repository(self.__onto, save_ontology_path)
-        self.__llm_client = ChatGptClient(ChatGptClientConfig.from_yaml(configs['openai']), prompt)
-        self.__text_processor = TextProcessor(TextProcessorConfig.from_yaml(configs['text_processor']),
-                                              self.__llm_client,
-                                              DefaultJsonAdapter())
-        if mode == 'nl_file':
+        self.__configs = configs
+        self.__place_generator_factory = place_generator_factory
+        self.__place_generator = None
+        self.__mode = mode
+        client_config = ChatGptClientConfig.from_yaml(configs['openai'])
+        pool_config = LLMClientPoolConfig.from_yaml(configs['openai'])
+        first_prompt = targets[0][0]
+        cascade_config = CascadeConfig.from_yaml(configs['cascade'])
+        if cascade_config.enabled:
+            tiers = []
+            if any(endpoint.model for endpoint in pool_config.endpoints):
+                logger.warning("The model cascade is enabled, the models of openai.endpoints are ignored and every "
+                               "tier sends its own model to all endpoints.")
+            for tier_config in cascade_config.tiers:
+                tier_client_config = tier_config.client_config(client_config)
+                tiers.append(CascadeTier(tier_config, tier_client_config,
+                                         AppLogic.__create_llm_client(tier_client_config, pool_config, first_prompt,
+                                                                      use_endpoint_models=False)))
+            self.__llm_client = ModelCascade(tiers)
+        else:
+            self.__llm_client = AppLogic.__create_llm_client(client_config, pool_config, first_prompt)
+        text_processor_config = TextProcessorConfig.from_yaml(configs['text_processor'])
+        semaphore = asyncio.Semaphore(text_processor_config.text_processor_semaphore_size)
+        self.__targets = [
+            EnrichmentTarget(AppLogic.__target_name(number, save_ontology_path, targets), prompt, onto,
+                             save_ontology_path, ontology_store, configs, self.__llm_client.with_prompt(prompt),
+                             semaphore, len(targets) > 1)
+            for number, (prompt, onto, save_ontology_path) in enumerate(targets, start=1)
+        ]
+        self.__chunker = min((target.text_processor for target in self.__targets),
+                             key=lambda text_processor: text_processor.get_tokens_limitation())
+        text_cache_config = TextCacheConfig.from_yaml(configs['text_cache'])
+        if mode == 'wiki_dump':
+            self.__text_source = None
+        elif mode == 'nl_file':
             self.__text_source = FromNLFileSource()
+        elif text_cache_config.enabled:
+            self.__text_source = CachedTextSource(FromWebScraperSource(WebScraper), text_cache_config.cache_dir,
+                                                  text_cache_config.ttl_seconds)
         else:
             self.__text_source = FromWebScraperSource(WebScraper)
+        self.__place_listener = place_listener
+        self.__place_lock = asyncio.Lock()
+
+    @staticmethod
+    def __create_llm_client(client_config: ChatGptClientConfig, pool_config: LLMClientPoolConfig, prompt: str,
+                            use_endpoint_models: bool = True):
+        if pool_config.endpoints:
+            return ChatGptClientPool(client_config, pool_config, prompt, use_endpoint_models=use_endpoint_models)
+        return ChatGptClient(client_config, prompt)
+
+    @staticmethod
+    def __target_name(number, save_ontology_path, targets):
+        name = os.path.splitext(os.path.basename(save_ontology_path))[0]
+        if sum(os.path.splitext(os.path.basename(target[2]))[0] == name for target in targets) > 1:
+            name = f"{name}-{number}"
+        return name
+
+    def __open_place_generator(self):
+        place_generator = self.__place_generator_factory()
+        if self.__mode == 'crawl':
+            frontier = CrawlFrontier(CrawlFrontierConfig.from_yaml(self.__configs['crawl_frontier']), place_generator)
+            return frontier, FromCrawlFrontierSource(WebScraper, frontier)
+        if self.__mode == 'wiki_dump':
+            wiki_dump_source = WikiDumpSource(WikiDumpConfig.from_yaml(self.__configs['wiki_dump']), place_generator)
+            return wiki_dump_source, wiki_dump_source
+        return place_generator, self.__text_source
+
+    async def __next_place(self):
+        async with self.__place_lock:
+            return await anext(self.__place_generator, None)
 
-    async def __worker(self):
-        async for place in self.__place_generator:
+    async def __worker(self, text_source: TextSource):
+        while (place := await self.__next_place()) is not None:
             if not global_state_manager.get_state("processing"):
+                if isinstance(self.__place_generator, CrawlFrontier):
+                    self.__place_generator.mark_fetched(place, succeeded=False)
+                await self.__place_finished(place, False)
                 break
             try:
-                text = await self.__text_source.get_text(place)
-                tasks = await self.__text_processor.process_text(text)
+                with global_stage_timers.stage('worker.place'):
+                    with global_stage_timers.stage('worker.get_text'):
+                        text = await text_source.get_text(place)
+                    manifests = [await target.load_manifest(place) for target in self.__targets]
+                    if not any(manifest is not None and chunk_hash(text) in manifest for manifest in manifests):
+                        packs = self.__chunker.try_pack_document(place, text)
+                        if packs is not None:
+                            for pack in packs:
+                                await self.__process_pack(pack)
+                            continue
+                    succeeded = await self.__process_document(place, text, manifests)
 
-                for task in asyncio.as_completed(tasks):
-                    processed_chunk = await task
-                    self.__kb_repository.add_individuals(processed_chunk)
+            except Exception:
+                AppLogic.__report_place_error(place)
+                succeeded = False
+            await self.__place_finished(place, succeeded)
 
-                global_state_manager.trigger_callback("update_url_count", 1)
-
-            except Exception as e:
-                logger.error("Unexpected error during processing " + place, exc_info=True)
-                global_state_manager.trigger_callback("update_errors_tab",
-                                                      "Unexpected error during processing " + place)
+        for pack in self.__chunker.flush_document_pack():
+            if global_state_manager.get_state("processing"):
+                await self.__process_pack(pack)
                 continue
+            for place, _ in pack:
+                await self.__place_finished(place, False)
+
+    async def __process_document(self, place, text, manifests) -> bool:
+        with global_stage_timers.stage('text_processor.split'):
+            chunks = self.__chunker.split_text(text)
+        succeeded = await asyncio.gather(*[self.__process_target_document(target, place, chunks, manifest)
+                                           for target, manifest in zip(self.__targets, manifests)])
+        global_state_manager.trigger_callback("update_url_count", 1)
+        return all(succeeded)
+
+    async def __process_target_document(self, target: EnrichmentTarget, place, chunks, manifest) -> bool:
+        try:
+            tasks = target.text_processor.process_chunks(chunks, manifest)
+
+            aggregator = DocumentResultAggregator()
+            for task in asyncio.as_completed(tasks):
+                aggregator.add(await task)
+
+            processed_document = aggregator.result()
+            if processed_document is not None:
+                with global_stage_timers.stage('worker.write'):
+                    await target.kb_writer.add_individuals(processed_document)
+
+            if manifest is not None:
+                await target.chunk_manifest_store.save(manifest)
+                if manifest.reused:
+                    logger.info(f"Reused {manifest.reused} of {len(tasks)} chunk results for {place} "
+                                f"in '{target.name}'")
+            return True
+        except Exception:
+            AppLogic.__report_place_error(place, target)
+            return False
+
+    async def __process_pack(self, pack):
+        if len(pack) == 1:
+            place, text = pack[0]
+            try:
+                succeeded = await self.__process_document(
+                    place, text, [await target.load_manifest(place) for target in self.__targets])
+            except Exception:
+                AppLogic.__report_place_error(place)
+                succeeded = False
+            await self.__place_finished(place, succeeded)
+            return
+
+        failed_places = set()
+        for target_failed_places in await asyncio.gather(*[self.__process_target_pack(target, pack)
+                                                           for target in self.__targets]):
+            failed_places.update(target_failed_places)
+        global_state_manager.trigger_callback("update_url_count", len(pack))
+        for place, _ in pack:
+            await self.__place_finished(place, place not in failed_places)
+
+    async def __process_target_pack(self, target: EnrichmentTarget, pack) -> set:
+        try:
+            processed_documents = await target.text_processor.process_document_pack(pack)
+        except Exception:
+            for place, _ in pack:
+                AppLogic.__report_place_error(place, target)
+            return {place for place, _ in pack}
+
+        failed_places = set()
+        for (place, text), (_, processed_document) in zip(pack, processed_documents):
+            try:
+                if processed_document is not None:
+                    await target.kb_writer.add_individuals(processed_document)
+                manifest = await target.load_manifest(place)
+                if manifest is not None:
+                    manifest.put(chunk_hash(text), processed_document)
+                    await target.chunk_manifest_store.save(manifest)
+            except Exception:
+                AppLogic.__report_place_error(place, target)
+                failed_places.add(place)
+        return failed_places
+
+    async def __place_finished(self, place, succeeded: bool):
+        if self.__place_listener is None:
+            return
+        try:
+            await self.__place_listener.place_finished(place, succeeded)
+        except Exception:
+            logger.error(f"Could not record the outcome of {place}", exc_info=True)
+
+    @staticmethod
+    def __report_place_error(place, target: EnrichmentTarget | None = None):
+        message = "Unexpected error during processing " + place
+        if target is not None:
+            message += f" for '{target.name}'"
+        logger.error(message, exc_info=True)
+        global_state_manager.trigger_callback("update_errors_tab", message)
 
     async def run(self, pool_size=1):
-        tasks = [asyncio.create_task(self.__worker()) for _ in range(pool_size)]
-        await asyncio.gather(*tasks)
+        self.__place_generator, text_source = self.__open_place_generator()
+        profiling_session = ProfilingSession(load_profiling_config(self.__configs.get('profiling', {'enabled': False})))
+        await profiling_session.start()
+        for target in self.__targets:
+            target.kb_writer.start()
+        try:
+            tasks = [asyncio.create_task(self.__worker(text_source)) for _ in range(pool_size)]
+            await asyncio.gather(*tasks)
+            await asyncio.gather(*[target.kb_writer.export() for target in self.__targets if target.export_on_finish])
+        finally:
+            if isinstance(self.__place_generator, WikiDumpSource):
+                await self.__place_generator.close()
+            for target in self.__targets:
+                await target.kb_writer.stop()
+            if isinstance(self.__llm_client, ChatGptClientPool):
+                logger.info(f"LLM endpoint stats: {self.__llm_client.get_endpoint_stats()}")
+            if isinstance(self.__llm_client, ModelCascade):
+                report = self.__llm_client.report()
+                logger.info("Model cascade:\n" + report)
+                global_state_manager.trigger_callback("update_added_individuals_tab", "Model cascade:\n" + report)
+            await profiling_session.stop()
         global_state_manager.trigger_callback("switch_button_to_start", None)
+
+    async def export(self):
+        for target in self.__targets:
+            if target.kb_writer.is_running():
+                await target.kb_writer.export()
+            else:
+                await asyncio.to_thread(target.kb_repository.export)
+        global_state_manager.trigger_callback("update_added_individuals_tab", "Ontology exported.")
+
+    def __dry_run_tiers(self, dry_run_config: DryRunConfig) -> list[DryRunTier]:
+        client_config = ChatGptClientConfig.from_yaml(self.__configs['openai'])
+        cascade_config = CascadeConfig.from_yaml(self.__configs['cascade'])
+        if cascade_config.enabled:
+            return [DryRunTier(tier_config.name, tier_config.client_config(client_config),
+                               tier_config.input_price_per_million, tier_config.output_price_per_million)
+                    for tier_config in cascade_config.tiers]
+        return [DryRunTier(client_config.model, client_config, dry_run_config.input_price_per_million,
+                           dry_run_config.output_price_per_million)]
+
+    async def dry_run(self):
+        text_processor_config = TextProcessorConfig.from_yaml(self.__configs['text_processor'])
+        dry_run_config = DryRunConfig.from_yaml(self.__configs['dry_run'])
+        planner = DryRunPlanner(dry_run_config, self.__dry_run_tiers(dry_run_config), text_processor_config,
+                                [target.prompt for target in self.__targets],
+                                text_processor_config.text_processor_semaphore_size)
+        if self.__mode == 'wiki_dump':
+            place_generator, text_source = self.__open_place_generator()
+            is_cached = None
+        else:
+            place_generator, text_source = self.__place_generator_factory(), self.__text_source
+            is_cached = text_source.is_cached if isinstance(text_source, CachedTextSource) else None
+        try:
+            report = await planner.plan(place_generator, text_source, is_cached)
+            global_state_manager.trigger_callback("update_dry_run_tab", report.describe())
+        except Exception:
+            logger.error("Dry run failed", exc_info=True)
+            global_state_manager.trigger_callback("update_errors_tab", "Dry run failed, see the log for details.")
+        finally:
+            if isinstance(place_generator, WikiDumpSource):
+                await place_generator.close()
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import logging
+import os
+import uuid
+
+import aiofiles
+
+from src.records import ExtractionResult, entity, relation, data_value
+
+logger = logging.getLogger("app_logger")
+
+_MISSING = object()
+_MANIFEST_VERSION = 2
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def serialize_result(result: ExtractionResult | None):
+    if result is None:
+        return None
+    return {
+        'entities': [[class_name, name, [list(label) for label in labels]]
+                     for class_name, name, labels in result.entities],
+        'relations': [list(record) for record in result.relations],
+        'data_values': [list(record) for record in result.data_values],
+    }
+
+
+def deserialize_result(data: dict | None):
+    if data is None:
+        return None
+    return ExtractionResult(
+        tuple(entity(class_name, name, labels) for class_name, name, labels in data['entities']),
+        tuple(relation(*record) for record in data['relations']),
+        tuple(data_value(*record) for record in data['data_values']),
+    )
+
+
+class ChunkManifest:
+    def __init__(self, place: str, previous_chunks: dict):
+        self.place = place
+        self.__previous_chunks = previous_chunks
+        self.__chunks = {}
+        self.reused = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__chunks or key in self.__previous_chunks
+
+    def get(self, key: str):
+        data = self.__chunks.get(key, _MISSING)
+        if data is _MISSING:
+            data = self.__previous_chunks[key]
+            self.__chunks[key] = data
+        self.reused += 1
+        return deserialize_result(data)
+
+    def put(self, key: str, result: dict | None):
+        self.__chunks[key] = serialize_result(result)
+
+    def chunks(self) -> dict:
+        return self.__chunks
+
+
+class ChunkManifestStore:
+    def __init__(self, manifest_dir: str, fingerprint: str):
+        self.__manifest_dir = manifest_dir
+        self.__fingerprint = fingerprint
+        os.makedirs(manifest_dir, exist_ok=True)
+
+    async def load(self, place: str) -> ChunkManifest:
+        try:
+            async with aiofiles.open(self.manifest_path(place), mode='r', encoding='utf-8') as f:
+                data = json.loads(await f.read())
+        except FileNotFoundError:
+            return ChunkManifest(place, {})
+        except (OSError, ValueError):
+            logger.error(f"Unreadable chunk manifest for {place}, processing it from scratch", exc_info=True)
+            return ChunkManifest(place, {})
+
+        if data.get('place') != place or data.get('fingerprint') != self.__fingerprint or \
+                data.get('version') != _MANIFEST_VERSION:
+            return ChunkManifest(place, {})
+        return ChunkManifest(place, data['chunks'])
+
+    async def save(self, manifest: ChunkManifest):
+        manifest_path = self.manifest_path(manifest.place)
+        tmp_path = f"{manifest_path}.{uuid.uuid4().hex}.tmp"
+        async with aiofiles.open(tmp_path, mode='w', encoding='utf-8') as f:
+            await f.write(json.dumps({'place': manifest.place, 'version': _MANIFEST_VERSION,
+                                      'fingerprint': self.__fingerprint,
+                                      'chunks': manifest.chunks()}, ensure_ascii=False))
+        os.replace(tmp_path, manifest_path)
+
+    def manifest_path(self, place: str) -> str:
+        return os.path.join(self.__manifest_dir, hashlib.sha1(place.encode('utf-8')).hexdigest() + '.json')
@@ -39,16 +39,249 @@ class ChatGptClientConfig:
         return cls(data['system_message'], data['num_responses'], data['model'], data['temperature'], data['model_tokens_limitation'])
 
 
+class LLMEndpointConfig:
+    def __init__(self, name, base_url, api_key_env, api_key, model, max_concurrency):
+        self.name = name
+        self.base_url = base_url
+        self.api_key_env = api_key_env
+        self.api_key = api_key
+        self.model = model
+        self.max_concurrency = max_concurrency
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data.get('name', data.get('base_url') or data.get('api_key_env')), data.get('base_url'),
+                   data.get('api_key_env', 'OPENAI_API_KEY'), data.get('api_key'), data.get('model'),
+                   data.get('max_concurrency'))
+
+
+class LLMClientPoolConfig:
+    def __init__(self, endpoints, failure_threshold, cooldown_seconds, max_attempts):
+        self.endpoints = endpoints
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.max_attempts = max_attempts
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls([LLMEndpointConfig.from_yaml(endpoint) for endpoint in data.get('endpoints') or []],
+                   data.get('endpoint_failure_threshold', 3), data.get('endpoint_cooldown_seconds', 30),
+                   max(1, data.get('max_attempts', 3)))
+
+
+class CascadeTierConfig:
+    def __init__(self, name, model, num_responses, temperature, model_tokens_limitation, input_price_per_million,
+                 output_price_per_million):
+        self.name = name
+        self.model = model
+        self.num_responses = num_responses
+        self.temperature = temperature
+        self.model_tokens_limitation = model_tokens_limitation
+        self.input_price_per_million = input_price_per_million
+        self.output_price_per_million = output_price_per_million
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data.get('name', data['model']), data['model'], data.get('num_responses'), data.get('temperature'),
+                   data.get('model_tokens_limitation'), data.get('input_price_per_million', 0.0),
+                   data.get('output_price_per_million', 0.0))
+
+    def client_config(self, base: ChatGptClientConfig) -> ChatGptClientConfig:
+        return ChatGptClientConfig(base.system_message, self.num_responses or base.num_responses, self.model,
+                                   base.temperature if self.temperature is None else self.temperature,
+                                   self.model_tokens_limitation or base.model_tokens_limitation)
+
+
+class CascadeConfig:
+    def __init__(self, enabled, tiers, min_agreement, max_invalid_share, validate_ontology_terms, max_unknown_share,
+                 escalate_empty):
+        self.enabled = enabled
+        self.tiers = tiers
+        self.min_agreement = min_agreement
+        self.max_invalid_share = max_invalid_share
+        self.validate_ontology_terms = validate_ontology_terms
+        self.max_unknown_share = max_unknown_share
+        self.escalate_empty = escalate_empty
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data['enabled'], [CascadeTierConfig.from_yaml(tier) for tier in data.get('tiers') or []],
+                   data['min_agreement'], data['max_invalid_share'], data['validate_ontology_terms'],
+                   data['max_unknown_share'], data['escalate_empty'])
+
+
 class TextProcessorConfig:
-    def __init__(self, overlap_sentences, separators, threshold, text_processor_semaphore_size):
+    def __init__(self, overlap_sentences, separators, threshold, text_processor_semaphore_size,
+                 document_packing=False, packing_max_document_tokens=2000, packing_max_documents=10,
+                 known_entity_annotation=False, known_entity_min_label_length=3, known_entities_token_budget=1000,
+                 content_defined_chunking=False, min_chunk_tokens=200, target_chunk_tokens=1000):
         self.overlap_sentences = overlap_sentences
         self.separators = separators
         self.threshold = threshold
         self.text_processor_semaphore_size = text_processor_semaphore_size
+        self.document_packing = document_packing
+        self.packing_max_document_tokens = packing_max_document_tokens
+        self.packing_max_documents = packing_max_documents
+        self.known_entity_annotation = known_entity_annotation
+        self.known_entity_min_label_length = known_entity_min_label_length
+        self.known_entities_token_budget = known_entities_token_budget
+        self.content_defined_chunking = content_defined_chunking
+        self.min_chunk_tokens = min_chunk_tokens
+        self.target_chunk_tokens = target_chunk_tokens
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data['overlap_sentences'], data['separators'], data['threshold'], data['text_processor_semaphore_size'],
+                   data.get('document_packing', False), data.get('packing_max_document_tokens', 2000),
+                   data.get('packing_max_documents', 10), data.get('known_entity_annotation', False),
+                   data.get('known_entity_min_label_length', 3), data.get('known_entities_token_budget', 1000),
+                   data.get('content_defined_chunking', False), data.get('min_chunk_tokens', 200),
+                   data.get('target_chunk_tokens', 1000))
+
+class RepositoryConfig:
+    def __init__(self, writer_max_batch_size, export_on_finish=True, backend='owlready2', triple_log_dir='triple_log'):
+        self.writer_max_batch_size = writer_max_batch_size
+        self.export_on_finish = export_on_finish
+        self.backend = backend
+        self.triple_log_dir = triple_log_dir
 
     @classmethod
     def from_yaml(cls, data: dict):
-        return cls(data['overlap_sentences'], data['separators'], data['threshold'], data['text_processor_semaphore_size'])
+        return cls(data['writer_max_batch_size'], data.get('export_on_finish', True),
+                   data.get('backend', 'owlready2'), data.get('triple_log_dir', 'triple_log'))
+
+
+class OntologyStoreConfig:
+    def __init__(self, quadstore_enabled, quadstore_dir):
+        self.quadstore_enabled = quadstore_enabled
+        self.quadstore_dir = quadstore_dir
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data['quadstore_enabled'], data['quadstore_dir'])
+
+class CrawlFrontierConfig:
+    def __init__(self, politeness_delay_seconds, max_in_flight_per_domain, max_depth, same_site_only,
+                 include_patterns, exclude_patterns, seed_buffer_size, bloom_capacity, bloom_error_rate, seen_path):
+        self.politeness_delay_seconds = politeness_delay_seconds
+        self.max_in_flight_per_domain = max_in_flight_per_domain
+        self.max_depth = max_depth
+        self.same_site_only = same_site_only
+        self.include_patterns = include_patterns
+        self.exclude_patterns = exclude_patterns
+        self.seed_buffer_size = seed_buffer_size
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.seen_path = seen_path
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data['politeness_delay_seconds'], data['max_in_flight_per_domain'], data['max_depth'],
+                   data['same_site_only'], data.get('include_patterns') or [], data.get('exclude_patterns') or [],
+                   data['seed_buffer_size'], data['bloom_capacity'], data['bloom_error_rate'], data.get('seen_path'))
+
+class TextCacheConfig:
+    def __init__(self, enabled, cache_dir, ttl_seconds):
+        self.enabled = enabled
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data['enabled'], data['cache_dir'], data.get('ttl_seconds'))
+
+
+class ChunkManifestConfig:
+    def __init__(self, enabled, manifest_dir):
+        self.enabled = enabled
+        self.manifest_dir = manifest_dir
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data['enabled'], data['manifest_dir'])
+
+
+class WorkQueueConfig:
+    def __init__(self, lease_seconds, heartbeat_seconds, max_attempts, poll_seconds):
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data['lease_seconds'], data['heartbeat_seconds'], data['max_attempts'], data['poll_seconds'])
+
+
+class WikiDumpConfig:
+    def __init__(self, namespaces, titles_file, categories, skip_redirects, min_text_chars, use_multistream_index,
+                 workers, batch_pages, buffer_pages):
+        self.namespaces = namespaces
+        self.titles_file = titles_file
+        self.categories = categories
+        self.skip_redirects = skip_redirects
+        self.min_text_chars = min_text_chars
+        self.use_multistream_index = use_multistream_index
+        self.workers = workers
+        self.batch_pages = batch_pages
+        self.buffer_pages = buffer_pages
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data.get('namespaces') or [], data.get('titles_file'), data.get('categories') or [],
+                   data['skip_redirects'], data['min_text_chars'], data['use_multistream_index'],
+                   data.get('workers'), data['batch_pages'], data['buffer_pages'])
+
+
+class DryRunConfig:
+    def __init__(self, workers, batch_size, fetch_concurrency, output_tokens_per_response, input_price_per_million,
+                 output_price_per_million, request_base_latency_seconds, output_tokens_per_second,
+                 requests_per_minute, tokens_per_minute):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.fetch_concurrency = fetch_concurrency
+        self.output_tokens_per_response = output_tokens_per_response
+        self.input_price_per_million = input_price_per_million
+        self.output_price_per_million = output_price_per_million
+        self.request_base_latency_seconds = request_base_latency_seconds
+        self.output_tokens_per_second = output_tokens_per_second
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data.get('workers'), data['batch_size'], data['fetch_concurrency'],
+                   data['output_tokens_per_response'], data['input_price_per_million'],
+                   data['output_price_per_million'], data['request_base_latency_seconds'],
+                   data['output_tokens_per_second'], data.get('requests_per_minute'), data.get('tokens_per_minute'))
+
+class StartupConfig:
+    def __init__(self, prewarm):
+        self.prewarm = prewarm
+
+    @classmethod
+    def from_yaml(cls, data: dict):
+        return cls(data['prewarm'])
+
+
+class ProfilingConfig:
+    def __init__(self, enabled, profiler, output_dir, sampling_interval_ms, asyncio_debug, slow_callback_ms,
+                 lag_probe_interval_ms, lag_warning_ms):
+        self.enabled = enabled
+        self.profiler = profiler
+        self.output_dir = output_dir
+        self.sampling_interval_ms = sampling_interval_ms
+        self.asyncio_debug = asyncio_debug
+        self.slow_callback_ms = slow_callback_ms
+        self.lag_probe_interval_ms = lag_probe_interval_ms
+        self.lag_warning_ms = lag_warning_ms
+
+    @classmethod
+    def from_yaml(cls, data: dict, overrides: dict = None):
+        data = {**data, **{key: value for key, value in (overrides or {}).items() if value is not None}}
+        return cls(data['enabled'], data.get('profiler'), data['output_dir'], data['sampling_interval_ms'],
+                   data['asyncio_debug'], data['slow_callback_ms'], data.get('lag_probe_interval_ms'),
+                   data['lag_warning_ms'])
 
 def get_yaml_configs():
     config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'resources', 'application.yaml')
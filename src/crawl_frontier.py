@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import re
+import time
+from collections import deque
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urljoin, urlsplit, urlunsplit
+
+from src.config import CrawlFrontierConfig
+
+logger = logging.getLogger("app_logger")
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+_PATH_SAFE_CHARS = "/:@!$&'()*+,;=-._~"
+_TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid)$')
+_SEEN_SAVE_INTERVAL = 500
+
+
+def canonicalize_url(url: str, base_url: str | None = None) -> str | None:
+    try:
+        return _canonicalize_url(url, base_url)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def _canonicalize_url(url: str, base_url: str | None) -> str | None:
+    url = url.strip()
+    if not url:
+        return None
+    if base_url is not None:
+        url = urljoin(base_url, url)
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.rstrip('.').encode('idna').decode('ascii').lower()
+    netloc = host if parts.port in (None, _DEFAULT_PORTS[scheme]) else f"{host}:{parts.port}"
+
+    segments = []
+    for segment in unquote(parts.path).split('/'):
+        if segment == '..':
+            if segments:
+                segments.pop()
+        elif segment != '.':
+            segments.append(segment)
+    path = quote('/'.join(segments), safe=_PATH_SAFE_CHARS) or '/'
+    if not path.startswith('/'):
+        path = '/' + path
+
+    query = urlencode(sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if not _TRACKING_PARAMS.match(key)))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def site_of(url: str) -> str:
+    host = urlsplit(url).netloc
+    return host[4:] if host.startswith('www.') else host
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.__size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.__hash_count = max(1, round(self.__size / capacity * math.log(2)))
+        self.__bits = bytearray((self.__size + 7) // 8)
+
+    def add(self, item: str) -> bool:
+        added = False
+        for position in self.__positions(item):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self.__bits[byte] & mask:
+                self.__bits[byte] |= mask
+                added = True
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.__bits[position >> 3] & (1 << (position & 7)) for position in self.__positions(item))
+
+    def __positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.__size for i in range(self.__hash_count)]
+
+    def save(self, path: str):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.__size.to_bytes(8, 'little'))
+            f.write(self.__hash_count.to_bytes(4, 'little'))
+            f.write(self.__bits)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        with open(path, 'rb') as f:
+            size = int.from_bytes(f.read(8), 'little')
+            hash_count = int.from_bytes(f.read(4), 'little')
+            if size != self.__size or hash_count != self.__hash_count:
+                return False
+            self.__bits = bytearray(f.read())
+        return True
+
+
+class CrawlFrontier:
+    def __init__(self, config: CrawlFrontierConfig, seed_generator):
+        self.__seed_generator = seed_generator
+        self.__seeds_exhausted = False
+        self.__politeness_delay = config.politeness_delay_seconds
+        self.__max_in_flight_per_domain = config.max_in_flight_per_domain
+        self.__max_depth = config.max_depth
+        self.__same_site_only = config.same_site_only
+        self.__include_patterns = [re.compile(pattern) for pattern in config.include_patterns]
+        self.__exclude_patterns = [re.compile(pattern) for pattern in config.exclude_patterns]
+        self.__seed_buffer_size = config.seed_buffer_size
+        self.__seen_path = config.seen_path
+
+        self.__seen = BloomFilter(config.bloom_capacity, config.bloom_error_rate)
+        self.__fetched = BloomFilter(config.bloom_capacity, config.bloom_error_rate)
+        self.__unsaved_fetches = 0
+        if self.__seen_path and os.path.exists(self.__seen_path):
+            if self.__fetched.load(self.__seen_path):
+                self.__seen.load(self.__seen_path)
+            else:
+                logger.error(f"Seen-set {self.__seen_path} was built with other parameters and is ignored.")
+
+        self.__domain_queues = {}
+        self.__domain_order = deque()
+        self.__next_dispatch = {}
+        self.__in_flight = {}
+        self.__depths = {}
+        self.__queued_count = 0
+        self.__changed = asyncio.Event()
+        self.__lock = asyncio.Lock()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        async with self.__lock:
+            while True:
+                await self.__fill_from_seeds()
+                url, wait = self.__pick()
+                if url is not None:
+                    return url
+                if wait is None:
+                    if self.__seeds_exhausted and not any(self.__in_flight.values()):
+                        self.__save_seen()
+                        raise StopAsyncIteration
+                    wait = self.__politeness_delay or 1
+                self.__changed.clear()
+                try:
+                    await asyncio.wait_for(self.__changed.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    def add_links(self, source_url: str, links):
+        try:
+            depth = self.__depths.get(source_url, 0) + 1
+            if depth <= self.__max_depth:
+                for link in links:
+                    url = canonicalize_url(link, source_url)
+                    if url is not None and self.__accepts(url, source_url):
+                        self.__enqueue(url, depth)
+        finally:
+            self.mark_fetched(source_url, succeeded=True)
+
+    def mark_fetched(self, url: str, succeeded: bool):
+        domain = site_of(url)
+        if self.__in_flight.get(domain):
+            self.__in_flight[domain] -= 1
+        self.__depths.pop(url, None)
+        if succeeded and self.__seen_path:
+            self.__fetched.add(url)
+            self.__unsaved_fetches += 1
+            if self.__unsaved_fetches >= _SEEN_SAVE_INTERVAL:
+                self.__save_seen()
+        self.__changed.set()
+
+    def __accepts(self, url: str, source_url: str) -> bool:
+        if self.__same_site_only and site_of(url) != site_of(source_url):
+            return False
+        if self.__include_patterns and not any(pattern.search(url) for pattern in self.__include_patterns):
+            return False
+        return not any(pattern.search(url) for pattern in self.__exclude_patterns)
+
+    async def __fill_from_seeds(self):
+        while not self.__seeds_exhausted and self.__queued_count < self.__seed_buffer_size:
+            try:
+                line = await anext(self.__seed_generator)
+            except StopAsyncIteration:
+                self.__seeds_exhausted = True
+                return
+            url = canonicalize_url(line)
+            if url is None:
+                if line.strip():
+                    logger.error(f"Skipping invalid URL in frontier seeds: {line.strip()}")
+                continue
+            self.__enqueue(url, 0)
+
+    def __enqueue(self, url: str, depth: int):
+        if not self.__seen.add(url):
+            return
+        domain = site_of(url)
+        if domain not in self.__domain_queues:
+            self.__domain_queues[domain] = deque()
+            self.__domain_order.append(domain)
+        self.__domain_queues[domain].append(url)
+        self.__depths[url] = depth
+        self.__queued_count += 1
+        self.__changed.set()
+
+    def __pick(self):
+        now = time.monotonic()
+        earliest = None
+        for _ in range(len(self.__domain_order)):
+            domain = self.__domain_order[0]
+            self.__domain_order.rotate(-1)
+            if self.__in_flight.get(domain, 0) >= self.__max_in_flight_per_domain:
+                continue
+            ready_at = self.__next_dispatch.get(domain, 0)
+            if ready_at > now:
+                earliest = ready_at if earliest is None else min(earliest, ready_at)
+                continue
+
+            url = self.__domain_queues[domain].popleft()
+            self.__queued_count -= 1
+            if not self.__domain_queues[domain]:
+                del self.__domain_queues[domain]
+                self.__domain_order.remove(domain)
+            self.__next_dispatch[domain] = now + self.__politeness_delay
+            self.__in_flight[domain] = self.__in_flight.get(domain, 0) + 1
+            return url, None
+        return None, None if earliest is None else earliest - now
+
+    def __save_seen(self):
+        if self.__seen_path:
+            self.__unsaved_fetches = 0
+            try:
+                self.__fetched.save(self.__seen_path)
+            except OSError:
+                logger.error(f"Failed to save seen-set {self.__seen_path}", exc_info=True)
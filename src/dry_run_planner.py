@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+from src.config import ChatGptClientConfig, DryRunConfig, TextProcessorConfig
+from src.text_processor import TextProcessor, DefaultJsonAdapter, PACKED_DOCUMENTS_INSTRUCTION, \
+    PACKED_DOCUMENT_HEADER, PACKED_DOCUMENT_FOOTER
+from src.text_producer import TextSource
+from src.tokenizer import encoding_for_model
+
+logger = logging.getLogger("app_logger")
+
+_worker_text_processor = None
+_worker_token_counter = None
+
+
+class TiktokenCounter:
+    def __init__(self, model: str, available_token_count: int):
+        self.__encoding = encoding_for_model(model)
+        self.__available_token_count = available_token_count
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.__encoding.encode(text))
+
+    def get_available_token_count(self) -> int:
+        return self.__available_token_count
+
+
+def _init_worker(model: str, available_token_count: int, text_processor_config: TextProcessorConfig):
+    global _worker_text_processor, _worker_token_counter
+    _worker_token_counter = TiktokenCounter(model, available_token_count)
+    _worker_text_processor = TextProcessor(text_processor_config, _worker_token_counter, DefaultJsonAdapter())
+
+
+def _measure_texts(texts: list) -> list:
+    return [(_worker_token_counter.count_tokens(text),
+             [_worker_token_counter.count_tokens(chunk) for chunk in _worker_text_processor.split_text(text)])
+            for text in texts]
+
+
+class DryRunTier:
+    def __init__(self, name: str, client_config: ChatGptClientConfig, input_price_per_million: float,
+                 output_price_per_million: float):
+        self.name = name
+        self.client_config = client_config
+        self.input_price_per_million = input_price_per_million
+        self.output_price_per_million = output_price_per_million
+
+
+class DryRunReport:
+    def __init__(self):
+        self.documents = 0
+        self.failed_documents = 0
+        self.fetched_documents = 0
+        self.document_tokens = 0
+        self.chunks = 0
+        self.packed_documents = 0
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.annotation_tokens_per_request = 0
+        self.escalation_costs = []
+        self.wall_time_seconds = 0.0
+        self.planning_seconds = 0.0
+
+    def describe(self) -> str:
+        return (f"Dry run report (no LLM calls were made)\n"
+                f"  Documents: {self.documents} ({self.failed_documents} failed, "
+                f"{self.fetched_documents} fetched, {self.packed_documents} packed)\n"
+                f"  Document tokens: {self.document_tokens}\n"
+                f"  Chunks: {self.chunks}\n"
+                f"  Requests: {self.requests}\n"
+                f"  Input tokens: {self.input_tokens}\n"
+                f"  Output tokens (estimated): {self.output_tokens}\n"
+                f"  Cost (estimated): ${self.cost:.2f}\n"
+                + (f"  Known entity annotation: up to {self.annotation_tokens_per_request} input tokens per request\n"
+                   if self.annotation_tokens_per_request else "")
+                + ''.join(f"  Cost if every request escalates to '{name}': +${cost:.2f}\n"
+                          for name, cost in self.escalation_costs) +
+                f"  Wall time (estimated): {self.wall_time_seconds / 60:.1f} min\n"
+                f"  Planning took {self.planning_seconds:.1f} s")
+
+
+class DryRunPlanner:
+    def __init__(self, config: DryRunConfig, tiers: list[DryRunTier], text_processor_config: TextProcessorConfig,
+                 prompts: list, concurrency: int):
+        self.__config = config
+        self.__tiers = tiers
+        self.__model = tiers[0].client_config.model
+        self.__text_processor_config = text_processor_config
+        self.__concurrency = concurrency
+
+        self.__request_overhead_tokens = [DryRunPlanner.__overhead_tokens(tier.client_config, prompts)
+                                          for tier in tiers]
+        self.__available_token_count = min(tier.client_config.model_tokens_limitation - max(overhead_tokens)
+                                           for tier, overhead_tokens in zip(tiers, self.__request_overhead_tokens))
+        self.__annotation_tokens = (text_processor_config.known_entities_token_budget
+                                    if text_processor_config.known_entity_annotation else 0)
+        self.__available_token_count -= self.__annotation_tokens
+        counter = TiktokenCounter(self.__model, 0)
+        self.__packing_instruction_tokens = counter.count_tokens(PACKED_DOCUMENTS_INSTRUCTION)
+        self.__packing_delimiter_tokens = counter.count_tokens(PACKED_DOCUMENT_HEADER.format(1) +
+                                                               PACKED_DOCUMENT_FOOTER.format(1))
+        self.__document_tokens = {}
+        self.__packer = TextProcessor(text_processor_config,
+                                      TiktokenCounter(self.__model, self.__available_token_count),
+                                      DefaultJsonAdapter())
+
+    @staticmethod
+    def __overhead_tokens(client_config: ChatGptClientConfig, prompts: list) -> list:
+        counter = TiktokenCounter(client_config.model, 0)
+        system_message_tokens = counter.count_tokens(client_config.system_message)
+        return [counter.count_tokens(prompt) + system_message_tokens + 5 for prompt in prompts]
+
+    async def plan(self, place_generator, text_source: TextSource, is_cached=None) -> DryRunReport:
+        started = time.perf_counter()
+        report = DryRunReport()
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.__config.batch_size * 4)
+        workers = self.__config.workers or os.cpu_count()
+        in_flight = deque()
+        request_chunk_tokens = []
+
+        place_lock = asyncio.Lock()
+
+        async def next_place():
+            async with place_lock:
+                return await anext(place_generator, None)
+
+        async def fetch():
+            while (place := await next_place()) is not None:
+                report.documents += 1
+                document_id = report.documents
+                if is_cached is not None and not is_cached(place):
+                    report.fetched_documents += 1
+                try:
+                    await queue.put((document_id, await text_source.get_text(place)))
+                except Exception:
+                    report.failed_documents += 1
+                    logger.error("Dry run failed to read " + place, exc_info=True)
+
+        async def fetch_all():
+            await asyncio.gather(*[fetch() for _ in range(self.__config.fetch_concurrency)])
+            await queue.put(None)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.__model, self.__available_token_count,
+                                           self.__text_processor_config)) as executor:
+            fetcher = asyncio.create_task(fetch_all())
+            batch = []
+            while (item := await queue.get()) is not None:
+                batch.append(item)
+                if len(batch) >= self.__config.batch_size:
+                    in_flight.append(self.__submit(loop, executor, batch))
+                    batch = []
+                    if len(in_flight) >= workers * 2:
+                        self.__collect(await in_flight.popleft(), request_chunk_tokens, report)
+            if batch:
+                in_flight.append(self.__submit(loop, executor, batch))
+            await fetcher
+
+            while in_flight:
+                self.__collect(await in_flight.popleft(), request_chunk_tokens, report)
+            for pack in self.__packer.flush_document_pack():
+                request_chunk_tokens.append(self.__packed_request_tokens(pack, report))
+
+        self.__estimate(request_chunk_tokens, report)
+        report.planning_seconds = time.perf_counter() - started
+        logger.info(report.describe())
+        return report
+
+    def __submit(self, loop, executor, batch: list):
+        document_ids = [document_id for document_id, _ in batch]
+        future = loop.run_in_executor(executor, _measure_texts, [text for _, text in batch])
+        return asyncio.ensure_future(DryRunPlanner.__with_document_ids(document_ids, future))
+
+    @staticmethod
+    async def __with_document_ids(document_ids: list, future):
+        return document_ids, await future
+
+    def __collect(self, measured_batch: tuple, request_chunk_tokens: list, report: DryRunReport):
+        document_ids, measurements = measured_batch
+        for document_id, (document_tokens, chunk_tokens) in zip(document_ids, measurements):
+            report.document_tokens += document_tokens
+            report.chunks += len(chunk_tokens)
+            request_chunk_tokens.extend(self.__pack(document_id, document_tokens, chunk_tokens, report))
+
+    def __pack(self, document_id: int, document_tokens: int, chunk_tokens: list, report: DryRunReport) -> list:
+        packs = self.__packer.try_pack_document(document_id, '', document_tokens)
+        if packs is None:
+            return chunk_tokens
+        self.__document_tokens[document_id] = document_tokens
+        return [self.__packed_request_tokens(pack, report) for pack in packs]
+
+    def __packed_request_tokens(self, pack: list, report: DryRunReport) -> int:
+        if len(pack) == 1:
+            return self.__document_tokens.pop(pack[0][0])
+        report.packed_documents += len(pack)
+        return self.__packing_instruction_tokens + sum(
+            self.__document_tokens.pop(document_id) + self.__packing_delimiter_tokens for document_id, _ in pack)
+
+    def __estimate(self, request_chunk_tokens: list, report: DryRunReport):
+        targets = len(self.__request_overhead_tokens[0])
+        report.requests = len(request_chunk_tokens) * targets
+        report.annotation_tokens_per_request = self.__annotation_tokens
+        chunk_tokens = sum(request_chunk_tokens) * targets + report.requests * self.__annotation_tokens
+        tier_estimates = []
+        for tier, overhead_tokens in zip(self.__tiers, self.__request_overhead_tokens):
+            input_tokens = chunk_tokens + len(request_chunk_tokens) * sum(overhead_tokens)
+            output_tokens = (report.requests * tier.client_config.num_responses
+                             * self.__config.output_tokens_per_response)
+            tier_estimates.append((input_tokens, output_tokens,
+                                   (input_tokens * tier.input_price_per_million
+                                    + output_tokens * tier.output_price_per_million) / 1_000_000))
+        report.input_tokens, report.output_tokens, report.cost = tier_estimates[0]
+        report.escalation_costs = [(tier.name, cost) for tier, (_, _, cost) in zip(self.__tiers[1:],
+                                                                                   tier_estimates[1:])]
+
+        if not report.requests:
+            return
+        request_latency = (self.__config.request_base_latency_seconds
+                           + self.__config.output_tokens_per_response / self.__config.output_tokens_per_second)
+        concurrency_bound = math.ceil(report.requests / self.__concurrency) * request_latency
+        rpm_bound = report.requests / self.__config.requests_per_minute * 60 if self.__config.requests_per_minute else 0
+        tpm_bound = ((report.input_tokens + report.output_tokens) / self.__config.tokens_per_minute * 60
+                     if self.__config.tokens_per_minute else 0)
+        report.wall_time_seconds = max(concurrency_bound, rpm_bound, tpm_bound)
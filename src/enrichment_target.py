@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import os
+from typing import TYPE_CHECKING
+
+from src.chunk_manifest import ChunkManifestStore, chunk_hash
+from src.config import ChatGptClientConfig, TextProcessorConfig, RepositoryConfig, ChunkManifestConfig, CascadeConfig
+from src.escalation_policy import EscalationPolicy
+from src.known_entity_matcher import KnownEntityMatcher
+from src.model_cascade import ModelCascade
+from src.repository.kb_repository import KBRepository
+from src.repository.kb_writer import KBWriter
+from src.repository.ontology_owlready2_repository import OntologyOwlready2Repository
+from src.repository.ontology_store import OntologyStore
+from src.repository.triple_log_repository import TripleLogRepository
+from src.text_processor import TextProcessor, DefaultJsonAdapter, LLMClientProtocol
+
+if TYPE_CHECKING:
+    from owlready2 import Ontology
+
+logger = logging.getLogger("app_logger")
+
+
+class EnrichmentTarget:
+    kb_repository: KBRepository
+    llm_client: LLMClientProtocol
+
+    def __init__(self, name: str, prompt: str, onto: 'Ontology', save_ontology_path: str,
+                 ontology_store: OntologyStore, configs: dict, llm_client: LLMClientProtocol,
+                 semaphore: asyncio.Semaphore, own_triple_log_dir: bool):
+        self.name = name
+        self.prompt = prompt
+        self.onto = onto
+        repository_config = RepositoryConfig.from_yaml(configs['repository'])
+        if repository_config.backend == 'triple_log':
+            triple_log_dir = repository_config.triple_log_dir
+            if own_triple_log_dir:
+                triple_log_dir = os.path.join(triple_log_dir, name)
+            self.kb_repository = TripleLogRepository(triple_log_dir, onto.base_iri)
+            self.export_on_finish = True
+        else:
+            self.kb_repository = OntologyOwlready2Repository(onto, save_ontology_path, ontology_store)
+            self.export_on_finish = (repository_config.export_on_finish
+                                     and ontology_store.is_quadstore_backed(onto))
+        self.kb_writer = KBWriter(self.kb_repository, repository_config.writer_max_batch_size)
+
+        self.llm_client = llm_client
+        text_processor_config = TextProcessorConfig.from_yaml(configs['text_processor'])
+        known_entity_matcher = None
+        if text_processor_config.known_entity_annotation:
+            known_entity_matcher = KnownEntityMatcher.from_ontology(
+                onto, text_processor_config.known_entity_min_label_length)
+            logger.info(f"Known entity matcher for '{self.name}' built with {len(known_entity_matcher)} labels")
+        cascade_config = CascadeConfig.from_yaml(configs['cascade'])
+        escalation_policy = EscalationPolicy(cascade_config, onto) if isinstance(llm_client, ModelCascade) else None
+        self.text_processor = TextProcessor(text_processor_config, llm_client, DefaultJsonAdapter(),
+                                            known_entity_matcher, semaphore, escalation_policy)
+
+        chunk_manifest_config = ChunkManifestConfig.from_yaml(configs['chunk_manifest'])
+        self.chunk_manifest_store = None
+        if chunk_manifest_config.enabled:
+            client_config = ChatGptClientConfig.from_yaml(configs['openai'])
+            fingerprint_parts = [prompt, client_config.system_message, client_config.model, client_config.temperature,
+                                 client_config.num_responses, text_processor_config.threshold]
+            if escalation_policy is not None:
+                fingerprint_parts += [(tier.model, tier.num_responses, tier.temperature) for tier in cascade_config.tiers]
+                fingerprint_parts += [cascade_config.min_agreement, cascade_config.max_invalid_share,
+                                      cascade_config.validate_ontology_terms, cascade_config.max_unknown_share,
+                                      cascade_config.escalate_empty]
+            fingerprint = chunk_hash('\n'.join(map(str, fingerprint_parts)))
+            self.chunk_manifest_store = ChunkManifestStore(
+                os.path.join(chunk_manifest_config.manifest_dir, fingerprint[:16]), fingerprint)
+
+    async def load_manifest(self, place):
+        if self.chunk_manifest_store is None:
+            return None
+        return await self.chunk_manifest_store.load(place)
@@ -0,0 +1,48 @@
+from typing import TYPE_CHECKING
+
+from src.config import CascadeConfig
+from src.records import ExtractionResult
+
+if TYPE_CHECKING:
+    from owlready2 import Ontology
+
+INVALID_RESPONSES = 'invalid_responses'
+WEAK_AGREEMENT = 'weak_agreement'
+UNKNOWN_TERMS = 'unknown_terms'
+EMPTY_RESULT = 'empty_result'
+
+
+class EscalationPolicy:
+    def __init__(self, config: CascadeConfig, onto: 'Ontology | None' = None):
+        self.__min_agreement = config.min_agreement
+        self.__max_invalid_share = config.max_invalid_share
+        self.__max_unknown_share = config.max_unknown_share
+        self.__escalate_empty = config.escalate_empty
+        self.__classes = self.__object_properties = self.__data_properties = None
+        if onto is not None and config.validate_ontology_terms:
+            self.__classes = {ontology_class.name for ontology_class in onto.classes()}
+            self.__object_properties = {prop.name for prop in onto.object_properties()}
+            self.__data_properties = {prop.name for prop in onto.data_properties()}
+
+    def escalation_reason(self, choices: int, valid_choices: int, agreement: float,
+                          result: ExtractionResult | None) -> str | None:
+        if not valid_choices or (choices - valid_choices) / choices > self.__max_invalid_share:
+            return INVALID_RESPONSES
+        if result is None:
+            return EMPTY_RESULT if self.__escalate_empty else None
+        if agreement < self.__min_agreement:
+            return WEAK_AGREEMENT
+        if self.unknown_share(result) > self.__max_unknown_share:
+            return UNKNOWN_TERMS
+        return None
+
+    def unknown_share(self, result: ExtractionResult) -> float:
+        if self.__classes is None:
+            return 0.0
+        total = len(result.entities) + len(result.relations) + len(result.data_values)
+        if not total:
+            return 0.0
+        unknown = sum(record.class_name not in self.__classes for record in result.entities)
+        unknown += sum(record.property_name not in self.__object_properties for record in result.relations)
+        unknown += sum(record.property_name not in self.__data_properties for record in result.data_values)
+        return unknown / total
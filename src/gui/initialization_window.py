@@ -1,23 +1,22 @@
-import os
 import threading
 import tkinter as tk
-from pathlib import Path
 from tkinter import ttk
 
 import aiofiles
 import yaml
-from owlready2 import get_ontology
 
-from src.application_logic import AppLogic
 from src.exception.input_exception import InputError
 from src.gui.error_window import ErrorWindow
 from src.prompt_generator import generate_prompt
+from src.targets import InputValidator, prompt_from_file, targets_from_file
 
 
 async def place_generator_from_file(file_path):
-    async with aiofiles.open(file_path, 'r') as f:
+    async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
         async for line in f:
-            yield line
+            line = line.strip()
+            if line:
+                yield line
 
 
 async def single_place_generator(place):
@@ -30,25 +29,14 @@ def load_config(path):
         return configs
 
 
-def prompt_from_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return f.read()
-
-
-def load_onto(path):
-    try:
-        return get_ontology(path).load()
-    except Exception:
-        raise InputError("Failed to load ontology. Please check the path and try again.")
-
-
 class InitializationWindow:
-    def __init__(self, root):
+    def __init__(self, root, ontology_store):
         self.root = root
         self.app_logic = None
+        self.ontology_store = ontology_store
         self.init_win = tk.Toplevel(root)
         self.init_win.title("Initialize Configuration")
-        self.init_win.geometry("500x560")
+        self.init_win.geometry("500x660")
         self.init_win.withdraw()
         self.style = ttk.Style()
         self.style.configure("TLabelframe", background="#f5f5f5", padding=10)
@@ -56,7 +44,8 @@ class InitializationWindow:
         ttk.Label(self.init_win, text="Select Source Type:").pack(anchor="w", padx=10, pady=5)
         self.source_type = tk.StringVar(value="Single URL")
         options = [("Single URL", "Single URL"), ("URLs file", "URLs file"), ("NL text file", "NL text file"),
-                   ("NL paths file", "NL paths file")]
+                   ("NL paths file", "NL paths file"), ("Crawl URLs file", "Crawl URLs file"),
+                   ("Wiki dump file", "Wiki dump file")]
         for text, mode in options:
             ttk.Radiobutton(self.init_win, text=text, variable=self.source_type, value=mode).pack(anchor="w", padx=20)
 
@@ -71,6 +60,10 @@ class InitializationWindow:
         self.save_ontology_path_entry = ttk.Entry(self.init_win)
         self.save_ontology_path_entry.pack(fill="x", padx=10)
 
+        ttk.Label(self.init_win, text="Additional Targets File (optional):").pack(anchor="w", padx=10, pady=5)
+        self.targets_path_entry = ttk.Entry(self.init_win)
+        self.targets_path_entry.pack(fill="x", padx=10)
+
         ttk.Label(self.init_win, text="Prompt Configuration:").pack(anchor="w", padx=10, pady=5)
         self.prompt_source = tk.StringVar(value="Prompt")
 
@@ -104,7 +97,7 @@ class InitializationWindow:
 
     def generate_prompt(self):
         try:
-            onto = load_onto(self.ontology_path_entry.get())
+            onto = self.ontology_store.load(self.ontology_path_entry.get())
             self.prompt_entry.insert("1.0", generate_prompt(onto))
         except InputError as e:
             ErrorWindow(self.root, e.message)
@@ -113,7 +106,7 @@ class InitializationWindow:
     def initialize_app_logic(self):
         self.confirm_button.state(['disabled'])
         try:
-            onto = load_onto(self.ontology_path_entry.get())
+            onto = self.ontology_store.load(self.ontology_path_entry.get())
             save_ontology_path = self.save_ontology_path_entry.get()
 
             InputValidator.validate_save_path(save_ontology_path)
@@ -124,29 +117,39 @@ class InitializationWindow:
             else:
                 prompt = self.prompt_entry.get("1.0", "end-1c")
 
+            targets = [(prompt, onto, save_ontology_path)]
+            if self.targets_path_entry.get():
+                targets += targets_from_file(self.targets_path_entry.get(), self.ontology_store)
+
             if self.source_type.get() == 'Single URL' or self.source_type.get() == 'URLs file':
                 mode = 'url'
             if self.source_type.get() == 'NL text file' or self.source_type.get() == 'NL paths file':
                 mode = 'nl_file'
+            if self.source_type.get() == 'Crawl URLs file':
+                mode = 'crawl'
+            if self.source_type.get() == 'Wiki dump file':
+                mode = 'wiki_dump'
 
 
             place_entry = self.place_source_entry.get()
-            if self.source_type.get() == 'URLs file' or self.source_type.get() == 'NL paths file' or self.source_type.get() == 'NL text file':
+            if self.source_type.get() in ('URLs file', 'NL paths file', 'NL text file', 'Crawl URLs file',
+                                          'Wiki dump file'):
                 InputValidator.validate_read_path(place_entry)
-            if self.source_type.get() == 'Single URL' or self.source_type.get() == 'NL text file':
-                generator = single_place_generator(place_entry)
-            if self.source_type.get() == 'URLs file' or self.source_type.get() == 'NL paths file':
-                generator = place_generator_from_file(place_entry)
+            if self.source_type.get() in ('Single URL', 'NL text file', 'Wiki dump file'):
+                generator_factory = lambda: single_place_generator(place_entry)
+            if self.source_type.get() in ('URLs file', 'NL paths file', 'Crawl URLs file'):
+                generator_factory = lambda: place_generator_from_file(place_entry)
 
         except InputError as e:
             ErrorWindow(self.init_win, e.message)
             self.confirm_button.state(['!disabled'])
             return
         try:
-            self.app_logic = AppLogic(place_generator=generator, prompt=prompt,
-                                      onto=onto,
-                                      save_ontology_path=save_ontology_path,
-                                      mode=mode)
+            from src.application_logic import AppLogic
+            self.app_logic = AppLogic(place_generator_factory=generator_factory,
+                                      targets=targets,
+                                      mode=mode,
+                                      ontology_store=self.ontology_store)
         except Exception as e:
             ErrorWindow(self.init_win, "Wrong configs: \n" + str(e))
             self.confirm_button.state(['!disabled'])
@@ -160,25 +163,3 @@ class InitializationWindow:
 
     def is_exist(self):
         return self.init_win.winfo_exists()
-
-class InputValidator:
-    @staticmethod
-    def validate_save_path(save_path):
-        directory = Path(save_path).parent
-        if not directory.exists():
-            raise InputError("The specified directory for saving the ontology does not exist.")
-        if not os.access(directory, os.W_OK):
-            raise InputError("No write permission for the specified directory.")
-
-    @staticmethod
-    def validate_read_path(read_path):
-        path = Path(read_path)
-        if not path.is_file():
-            raise InputError("The specified file path does not exist or is not a file.")
-        if not os.access(path, os.R_OK):
-            raise InputError("The file is not accessible. Please check read permissions.")
-
-    @staticmethod
-    def validate_place_entry(place):
-        if not place:
-            raise InputError("The place field (URL or Path) is empty. Please provide a valid place.")
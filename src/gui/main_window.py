@@ -1,17 +1,35 @@
 import asyncio
+import importlib
+import logging
 import threading
 import tkinter as tk
 from tkinter import ttk
 
+from src.config import ChatGptClientConfig, OntologyStoreConfig, get_yaml_configs
 from src.gui.error_window import ErrorWindow
 from src.gui.initialization_window import InitializationWindow
 from src.gui.state_manager import global_state_manager
+from src.profiling import StartupTimer
+from src.repository.ontology_store import OntologyStore
+from src.tokenizer import encoding_for_model
+
+logger = logging.getLogger("app_logger")
+
+
+def load_deferred_subsystems(startup_timer: StartupTimer | None = None):
+    importlib.import_module('src.application_logic')
+    if startup_timer is not None:
+        startup_timer.mark('deferred: application logic imports')
+    encoding_for_model(ChatGptClientConfig.from_yaml(get_yaml_configs()['openai']).model)
+    if startup_timer is not None:
+        startup_timer.mark('deferred: tokenizer')
 
 
 class MainWindow:
     def __init__(self, root):
         self.root = root
-        self.init_window = InitializationWindow(root)
+        self.ontology_store = OntologyStore(OntologyStoreConfig.from_yaml(get_yaml_configs()['ontology_store']))
+        self.init_window = InitializationWindow(root, self.ontology_store)
 
         self.app_logic = None
         self.loop = asyncio.new_event_loop()
@@ -32,7 +50,8 @@ class MainWindow:
         for tab_name, callback_name in {"Added individuals": "update_added_individuals_tab",
                                         " ChatGPT request ": "update_ChatGPT_request_tab",
                                         "ChatGPT response": "update_ChatGPT_response_tab",
-                                        "         Errors         ": "update_errors_tab"}.items():
+                                        "         Errors         ": "update_errors_tab",
+                                        "Dry run": "update_dry_run_tab"}.items():
             tab = tk.Frame(self.notebook)
             self.notebook.add(tab, text=tab_name)
             text_area = tk.Text(tab, bg='#7F84FA', padx=5, pady=5)
@@ -79,11 +98,28 @@ class MainWindow:
         self.start_stop_button = ttk.Button(button_frame, text="Start", command=self.start_processing, style="MainButton.TButton")
         self.start_stop_button.pack(side="top", pady=5)
 
+        ttk.Button(button_frame, text="Dry run", command=self.start_dry_run,
+                   style="MainButton.TButton").pack(side="top", pady=5)
+
+        ttk.Button(button_frame, text="Export", command=self.export_ontology,
+                   style="MainButton.TButton").pack(side="top", pady=5)
+
+
 
+    def prewarm(self):
+        threading.Thread(target=MainWindow.__prewarm, daemon=True).start()
+
+    @staticmethod
+    def __prewarm():
+        try:
+            load_deferred_subsystems()
+        except Exception:
+            logger.warning("Could not prewarm the LLM client and the tokenizer, they are loaded on first use",
+                           exc_info=True)
 
     def show_initialize_window(self):
         if not self.init_window.is_exist():
-            self.init_window = InitializationWindow(self.root)
+            self.init_window = InitializationWindow(self.root, self.ontology_store)
         self.init_window.show()
 
 
@@ -96,6 +132,21 @@ class MainWindow:
         self.loop.call_soon_threadsafe(asyncio.create_task, self.app_logic.run(5))
         self.start_stop_button.config(text="Stop", command=self.stop_processing)
 
+    def start_dry_run(self):
+        app_logic = self.init_window.get_logic_object()
+        if app_logic is None:
+            ErrorWindow(self.root, "The application was not initialized.")
+            return
+        self.notebook.select(len(self.notebook.tabs()) - 1)
+        self.loop.call_soon_threadsafe(asyncio.create_task, app_logic.dry_run())
+
+    def export_ontology(self):
+        app_logic = self.init_window.get_logic_object()
+        if app_logic is None:
+            ErrorWindow(self.root, "The application was not initialized.")
+            return
+        self.loop.call_soon_threadsafe(asyncio.create_task, app_logic.export())
+
     def stop_processing(self):
         global_state_manager.set_state('processing', False)
         self.start_stop_button.config(text="Start", command=self.start_processing)
@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import contextlib
+import logging
+import signal
+
+from src.application_logic import AppLogic
+from src.config import OntologyStoreConfig, RepositoryConfig, WorkQueueConfig, configure_logging, get_yaml_configs
+from src.exception.input_exception import InputError
+from src.gui.state_manager import global_state_manager
+from src.prompt_generator import generate_prompt
+from src.repository.ontology_store import OntologyStore
+from src.targets import InputValidator, prompt_from_file, targets_from_file
+from src.work_queue import SqliteWorkQueue, WorkQueuePlaceSource
+
+logger = logging.getLogger("app_logger")
+
+
+def read_places(places_file: str):
+    with open(places_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def load_targets(args, ontology_store: OntologyStore) -> list:
+    targets = []
+    if args.ontology:
+        onto = ontology_store.load(args.ontology)
+        if args.prompt_file:
+            InputValidator.validate_read_path(args.prompt_file)
+            prompt = prompt_from_file(args.prompt_file)
+        else:
+            prompt = generate_prompt(onto)
+        targets.append((prompt, onto, args.save_path or args.ontology))
+    if args.targets_file:
+        targets += targets_from_file(args.targets_file, ontology_store)
+    return targets
+
+
+async def work(app_logic: AppLogic, place_source: WorkQueuePlaceSource, pool_size: int):
+    loop = asyncio.get_running_loop()
+    with contextlib.suppress(NotImplementedError):
+        loop.add_signal_handler(signal.SIGTERM, global_state_manager.set_state, 'processing', False)
+    try:
+        await app_logic.run(pool_size)
+    finally:
+        await place_source.release_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Share a durable queue of places between headless workers.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = subparsers.add_parser('enqueue', help="add places from a file, one per line")
+    enqueue_parser.add_argument('queue_path')
+    enqueue_parser.add_argument('places_file')
+
+    status_parser = subparsers.add_parser('status', help="show how many places are in each state")
+    status_parser.add_argument('queue_path')
+
+    requeue_parser = subparsers.add_parser('requeue-failed', help="give failed places another round of attempts")
+    requeue_parser.add_argument('queue_path')
+
+    work_parser = subparsers.add_parser('work', help="claim places from the queue until it is drained")
+    work_parser.add_argument('queue_path')
+    work_parser.add_argument('--ontology')
+    work_parser.add_argument('--save-path', help="defaults to the ontology path")
+    work_parser.add_argument('--prompt-file', help="generated from the ontology when omitted")
+    work_parser.add_argument('--targets-file', help="YAML file with additional targets")
+    work_parser.add_argument('--mode', choices=['url', 'nl_file'], default='url')
+    work_parser.add_argument('--pool-size', type=int, default=5)
+    work_parser.add_argument('--worker-id')
+    args = parser.parse_args()
+
+    configs = get_yaml_configs()
+    configure_logging(configs['logging'])
+    work_queue_config = WorkQueueConfig.from_yaml(configs['work_queue'])
+    try:
+        work_queue = SqliteWorkQueue(args.queue_path, work_queue_config.max_attempts)
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    if args.command == 'enqueue':
+        print(f"Enqueued {work_queue.enqueue(read_places(args.places_file))} new places")
+        return
+    if args.command == 'status':
+        print(work_queue.stats())
+        return
+    if args.command == 'requeue-failed':
+        print(f"Requeued {work_queue.requeue_failed()} failed places")
+        return
+
+    if RepositoryConfig.from_yaml(configs['repository']).backend != 'triple_log':
+        parser.error("workers sharing a queue must write through the triple_log repository backend, "
+                     "set repository.backend to triple_log and merge the segments with src.triple_log_merge")
+    ontology_store = OntologyStore(OntologyStoreConfig.from_yaml(configs['ontology_store']))
+    try:
+        targets = load_targets(args, ontology_store)
+    except InputError as e:
+        parser.error(e.message)
+    if not targets:
+        parser.error("give --ontology or --targets-file")
+
+    place_source = WorkQueuePlaceSource(work_queue, work_queue_config, args.worker_id)
+    global_state_manager.set_state('processing', True)
+    app_logic = AppLogic(place_generator_factory=place_source.places, targets=targets, mode=args.mode,
+                         ontology_store=ontology_store, place_listener=place_source)
+    logger.info(f"Worker {place_source.worker_id} started on {args.queue_path}")
+    asyncio.run(work(app_logic, place_source, args.pool_size))
+    print(work_queue.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from owlready2 import Ontology
+
+
+class AhoCorasickAutomaton:
+    def __init__(self):
+        self.__transitions = [{}]
+        self.__fail = [0]
+        self.__outputs = [[]]
+        self.__built = False
+
+    def add(self, pattern: str, payload):
+        state = 0
+        for char in pattern:
+            next_state = self.__transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self.__transitions)
+                self.__transitions[state][char] = next_state
+                self.__transitions.append({})
+                self.__fail.append(0)
+                self.__outputs.append([])
+            state = next_state
+        self.__outputs[state].append((len(pattern), payload))
+        self.__built = False
+
+    def build(self):
+        queue = deque(self.__transitions[0].values())
+        for state in queue:
+            self.__fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.__transitions[state].items():
+                queue.append(next_state)
+                fail_state = self.__fail[state]
+                while fail_state and char not in self.__transitions[fail_state]:
+                    fail_state = self.__fail[fail_state]
+                self.__fail[next_state] = self.__transitions[fail_state].get(char, 0)
+                self.__outputs[next_state] = self.__outputs[next_state] + self.__outputs[self.__fail[next_state]]
+        self.__built = True
+
+    def find(self, text: str):
+        if not self.__built:
+            self.build()
+        state = 0
+        for end, char in enumerate(text, start=1):
+            while state and char not in self.__transitions[state]:
+                state = self.__fail[state]
+            state = self.__transitions[state].get(char, 0)
+            for length, payload in self.__outputs[state]:
+                yield end - length, end, payload
+
+
+class KnownEntity:
+    __slots__ = ('id', 'class_names', 'label')
+
+    def __init__(self, entity_id: str, class_names: tuple, label: str):
+        self.id = entity_id
+        self.class_names = class_names
+        self.label = label
+
+
+class KnownEntityMatcher:
+    def __init__(self, min_label_length: int):
+        self.__min_label_length = min_label_length
+        self.__automaton = AhoCorasickAutomaton()
+        self.__size = 0
+
+    @classmethod
+    def from_ontology(cls, onto: 'Ontology', min_label_length: int):
+        matcher = cls(min_label_length)
+        for individual in onto.individuals():
+            class_names = tuple(parent.name for parent in individual.is_a if hasattr(parent, 'name'))
+            labels = {str(label) for label in individual.label}
+            labels.add(individual.name.replace('_', ' '))
+            for label in labels:
+                matcher.add(individual.name, class_names, label)
+        matcher.__automaton.build()
+        return matcher
+
+    def add(self, entity_id: str, class_names: tuple, label: str):
+        label = label.strip()
+        if len(label) < self.__min_label_length:
+            return
+        self.__automaton.add(label.casefold(), KnownEntity(entity_id, class_names, label))
+        self.__size += 1
+
+    def __len__(self):
+        return self.__size
+
+    def find(self, text: str) -> list:
+        folded = text.casefold()
+        if len(folded) != len(text):
+            folded = ''.join(char.casefold()[0] for char in text)
+        found = {}
+        for start, end, entity in self.__automaton.find(folded):
+            if KnownEntityMatcher.__is_word_boundary(folded, start - 1) and \
+                    KnownEntityMatcher.__is_word_boundary(folded, end):
+                found.setdefault(entity.id, entity)
+        return list(found.values())
+
+    @staticmethod
+    def __is_word_boundary(text: str, index: int) -> bool:
+        return index < 0 or index >= len(text) or not text[index].isalnum()
@@ -0,0 +1,151 @@
+import asyncio
+import copy
+import logging
+import os
+import time
+from typing import Collection
+
+import openai
+from openai import AsyncOpenAI
+from typing_extensions import override
+
+from src.config import ChatGptClientConfig, LLMClientPoolConfig, LLMEndpointConfig
+from src.text_processor import ChatGptClient, LLMClientProtocol
+
+logger = logging.getLogger("app_logger")
+
+_NON_RETRYABLE_STATUS_CODES = {400, 404, 413, 422}
+
+
+class LLMEndpoint:
+    def __init__(self, config: LLMEndpointConfig):
+        self.name = config.name
+        self.max_concurrency = config.max_concurrency
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.completed = 0
+        self.failed = 0
+
+    def is_healthy(self, now: float) -> bool:
+        return self.unhealthy_until <= now
+
+    def has_capacity(self) -> bool:
+        return self.max_concurrency is None or self.outstanding < self.max_concurrency
+
+    def load(self) -> float:
+        return self.outstanding / self.max_concurrency if self.max_concurrency else self.outstanding
+
+
+class ChatGptClientPool(LLMClientProtocol):
+    def __init__(self, config: ChatGptClientConfig, pool_config: LLMClientPoolConfig, prompt_instruction: str,
+                 client_factory=AsyncOpenAI, use_endpoint_models: bool = True):
+        self.__failure_threshold = pool_config.failure_threshold
+        self.__cooldown_seconds = pool_config.cooldown_seconds
+        self.__max_attempts = pool_config.max_attempts
+        self.__endpoints = [LLMEndpoint(endpoint_config) for endpoint_config in pool_config.endpoints]
+        if not self.__endpoints:
+            raise ValueError("LLM client pool requires at least one endpoint.")
+        self.__clients = {
+            endpoint: ChatGptClient(ChatGptClientPool.__endpoint_client_config(config, endpoint_config,
+                                                                               use_endpoint_models),
+                                    prompt_instruction,
+                                    client_factory(api_key=endpoint_config.api_key or
+                                                   os.getenv(endpoint_config.api_key_env),
+                                                   base_url=endpoint_config.base_url, max_retries=0))
+            for endpoint, endpoint_config in zip(self.__endpoints, pool_config.endpoints)
+        }
+        self.__capacity_changed = asyncio.Condition()
+
+    @staticmethod
+    def __endpoint_client_config(config: ChatGptClientConfig, endpoint_config: LLMEndpointConfig,
+                                 use_endpoint_models: bool):
+        if not endpoint_config.model or not use_endpoint_models:
+            return config
+        endpoint_client_config = copy.copy(config)
+        endpoint_client_config.model = endpoint_config.model
+        return endpoint_client_config
+
+    @override
+    def with_prompt(self, prompt_instruction: str) -> LLMClientProtocol:
+        pool = copy.copy(self)
+        pool.__clients = {endpoint: client.with_prompt(prompt_instruction)
+                          for endpoint, client in self.__clients.items()}
+        return pool
+
+    @override
+    async def get_response(self, text: str) -> Collection[str]:
+        last_error = None
+        tried = set()
+        for _ in range(self.__max_attempts):
+            endpoint = await self.__acquire(tried)
+            succeeded = None
+            try:
+                response = await self.__clients[endpoint].get_response(text)
+            except openai.APIStatusError as e:
+                if e.status_code in _NON_RETRYABLE_STATUS_CODES:
+                    succeeded = True
+                    raise
+                succeeded = False
+                last_error = e
+            except openai.OpenAIError as e:
+                succeeded = False
+                last_error = e
+            else:
+                succeeded = True
+                return response
+            finally:
+                await self.__release(endpoint, succeeded)
+
+            logger.error(f"LLM endpoint '{endpoint.name}' failed: {last_error}")
+            tried.add(endpoint)
+        raise last_error
+
+    @override
+    def count_tokens(self, text: str) -> int:
+        return max(client.count_tokens(text) for client in self.__clients.values())
+
+    @override
+    def get_available_token_count(self) -> int:
+        return min(client.get_available_token_count() for client in self.__clients.values())
+
+    def get_endpoint_stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [{'name': endpoint.name, 'outstanding': endpoint.outstanding, 'completed': endpoint.completed,
+                 'failed': endpoint.failed, 'healthy': endpoint.is_healthy(now)}
+                for endpoint in self.__endpoints]
+
+    async def __acquire(self, tried: set) -> LLMEndpoint:
+        async with self.__capacity_changed:
+            while True:
+                endpoint = self.__pick(tried)
+                if endpoint is not None:
+                    endpoint.outstanding += 1
+                    return endpoint
+                await self.__capacity_changed.wait()
+
+    async def __release(self, endpoint: LLMEndpoint, succeeded: bool | None):
+        async with self.__capacity_changed:
+            endpoint.outstanding -= 1
+            if succeeded:
+                endpoint.completed += 1
+                endpoint.consecutive_failures = 0
+                endpoint.unhealthy_until = 0.0
+            elif succeeded is not None:
+                endpoint.failed += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= self.__failure_threshold:
+                    endpoint.unhealthy_until = time.monotonic() + self.__cooldown_seconds
+                    logger.error(f"LLM endpoint '{endpoint.name}' marked unhealthy "
+                                 f"for {self.__cooldown_seconds} seconds.")
+            self.__capacity_changed.notify_all()
+
+    def __pick(self, tried: set) -> LLMEndpoint | None:
+        now = time.monotonic()
+        available = [endpoint for endpoint in self.__endpoints if endpoint.has_capacity()]
+        if not available:
+            return None
+        candidates = ([endpoint for endpoint in available if endpoint.is_healthy(now) and endpoint not in tried]
+                      or [endpoint for endpoint in available if endpoint.is_healthy(now)]
+                      or [min(available, key=lambda endpoint: endpoint.unhealthy_until)])
+        return min(candidates, key=LLMEndpoint.load)
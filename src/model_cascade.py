@@ -0,0 +1,96 @@
+import copy
+import time
+from collections import Counter
+from typing import Collection
+
+from typing_extensions import override
+
+from src.config import CascadeTierConfig, ChatGptClientConfig
+from src.text_processor import LLMClientProtocol
+
+
+class TierStats:
+    def __init__(self):
+        self.requests = 0
+        self.answered = 0
+        self.escalated = Counter()
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latency_seconds = 0.0
+
+
+class CascadeTier:
+    def __init__(self, config: CascadeTierConfig, client_config: ChatGptClientConfig, llm_client: LLMClientProtocol,
+                 stats: TierStats | None = None):
+        self.config = config
+        self.client_config = client_config
+        self.llm_client = llm_client
+        self.stats = stats or TierStats()
+        self.overhead_tokens = client_config.model_tokens_limitation - llm_client.get_available_token_count()
+
+    def with_prompt(self, prompt_instruction: str) -> 'CascadeTier':
+        return CascadeTier(self.config, self.client_config, self.llm_client.with_prompt(prompt_instruction),
+                           self.stats)
+
+    def cost(self) -> float:
+        return (self.stats.input_tokens * self.config.input_price_per_million +
+                self.stats.output_tokens * self.config.output_price_per_million) / 1_000_000
+
+
+class ModelCascade(LLMClientProtocol):
+    def __init__(self, tiers: list[CascadeTier]):
+        if not tiers:
+            raise ValueError("Model cascade requires at least one tier.")
+        self.__tiers = tiers
+
+    @override
+    def with_prompt(self, prompt_instruction: str) -> LLMClientProtocol:
+        cascade = copy.copy(self)
+        cascade.__tiers = [tier.with_prompt(prompt_instruction) for tier in self.__tiers]
+        return cascade
+
+    @override
+    async def get_response(self, text: str) -> Collection[str]:
+        return await self.get_tier_response(0, text)
+
+    async def get_tier_response(self, tier_index: int, text: str) -> Collection[str]:
+        tier = self.__tiers[tier_index]
+        started = time.perf_counter()
+        response = await tier.llm_client.get_response(text)
+        tier.stats.latency_seconds += time.perf_counter() - started
+        tier.stats.requests += 1
+        tier.stats.input_tokens += tier.overhead_tokens + tier.llm_client.count_tokens(text)
+        tier.stats.output_tokens += sum(tier.llm_client.count_tokens(choice or '') for choice in response)
+        return response
+
+    def tier_count(self) -> int:
+        return len(self.__tiers)
+
+    def record_answer(self, tier_index: int):
+        self.__tiers[tier_index].stats.answered += 1
+
+    def record_escalation(self, tier_index: int, reason: str):
+        self.__tiers[tier_index].stats.escalated[reason] += 1
+
+    @override
+    def count_tokens(self, text: str) -> int:
+        return self.__tiers[0].llm_client.count_tokens(text)
+
+    @override
+    def get_available_token_count(self) -> int:
+        return min(tier.llm_client.get_available_token_count() for tier in self.__tiers)
+
+    def report(self) -> str:
+        chunks = sum(tier.stats.answered for tier in self.__tiers)
+        lines = [f"{'tier':<24}{'requests':>10}{'answered':>10}{'escalated':>11}{'mean s':>9}{'cost $':>10}  reasons"]
+        for tier in self.__tiers:
+            stats = tier.stats
+            mean_latency = stats.latency_seconds / stats.requests if stats.requests else 0.0
+            reasons = ', '.join(f"{reason} {count}" for reason, count in stats.escalated.most_common())
+            lines.append(f"{tier.config.name:<24}{stats.requests:>10}{stats.answered:>10}"
+                         f"{sum(stats.escalated.values()):>11}{mean_latency:>9.2f}{tier.cost():>10.4f}  {reasons}")
+        if chunks:
+            latency = sum(tier.stats.latency_seconds for tier in self.__tiers)
+            cost = sum(tier.cost() for tier in self.__tiers)
+            lines.append(f"{chunks} chunks, {latency / chunks:.2f} s of requests and ${cost / chunks:.5f} per chunk")
+        return '\n'.join(lines)
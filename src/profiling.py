@@ -0,0 +1,254 @@
+import asyncio
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from src.config import ProfilingConfig
+
+logger = logging.getLogger("app_logger")
+
+_cli_overrides = {}
+
+
+def set_profiling_overrides(**overrides):
+    _cli_overrides.update(overrides)
+
+
+def load_profiling_config(data: dict) -> ProfilingConfig:
+    return ProfilingConfig.from_yaml(data, _cli_overrides)
+
+
+class StageTimers:
+    def __init__(self):
+        self.enabled = False
+        self.__stats = {}
+        self.__lock = threading.Lock()
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self.__timed(name)
+
+    @contextlib.contextmanager
+    def __timed(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float):
+        with self.__lock:
+            count, total, maximum = self.__stats.get(name, (0, 0.0, 0.0))
+            self.__stats[name] = (count + 1, total + seconds, max(maximum, seconds))
+
+    def reset(self):
+        with self.__lock:
+            self.__stats = {}
+
+    def report(self) -> str:
+        with self.__lock:
+            stats = sorted(self.__stats.items(), key=lambda item: item[1][1], reverse=True)
+        lines = [f"{'stage':<40}{'count':>8}{'total s':>12}{'mean ms':>12}{'max ms':>12}"]
+        for name, (count, total, maximum) in stats:
+            lines.append(f"{name:<40}{count:>8}{total:>12.3f}{total / count * 1000:>12.1f}{maximum * 1000:>12.1f}")
+        return '\n'.join(lines)
+
+
+global_stage_timers = StageTimers()
+
+
+class StartupTimer:
+    def __init__(self, started: float):
+        self.__started = started
+        self.__last = started
+        self.__phases = []
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.__phases.append((phase, now - self.__last))
+        self.__last = now
+
+    def report(self) -> str:
+        lines = [f"{'startup phase':<40}{'ms':>10}"]
+        for phase, seconds in self.__phases:
+            lines.append(f"{phase:<40}{seconds * 1000:>10.1f}")
+        lines.append(f"{'total':<40}{(self.__last - self.__started) * 1000:>10.1f}")
+        return '\n'.join(lines)
+
+
+class EventLoopLagMonitor:
+    def __init__(self, interval_seconds: float, warning_seconds: float):
+        self.__interval = interval_seconds
+        self.__warning = warning_seconds
+        self.__task = None
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        self.__task = asyncio.create_task(self.__probe())
+
+    async def stop(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.__task
+            self.__task = None
+
+    def report(self) -> str:
+        mean = self.total_lag / self.samples if self.samples else 0.0
+        return f"Event loop lag: {self.samples} samples, mean {mean * 1000:.1f} ms, max {self.max_lag * 1000:.1f} ms"
+
+    async def __probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.__interval
+            await asyncio.sleep(self.__interval)
+            lag = max(0.0, loop.time() - expected)
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.__warning:
+                logger.warning(f"Event loop lagged by {lag * 1000:.1f} ms")
+
+
+class SamplingProfiler:
+    def __init__(self, interval_seconds: float):
+        self.__interval = interval_seconds
+        self.__stop_event = threading.Event()
+        self.__thread = None
+        self.__frames = []
+        self.__frame_indexes = {}
+        self.__samples = {}
+        self.__started = 0.0
+        self.__finished = 0.0
+
+    def start(self):
+        self.__started = time.perf_counter()
+        self.__thread = threading.Thread(target=self.__run, name="sampling-profiler", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+        self.__thread.join()
+        self.__finished = time.perf_counter()
+
+    def dump_speedscope(self, path: str):
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        profiles = []
+        for thread_id, (stacks, weights) in self.__samples.items():
+            profiles.append({
+                'type': 'sampled',
+                'name': thread_names.get(thread_id, f"thread {thread_id}"),
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': self.__finished - self.__started,
+                'samples': stacks,
+                'weights': weights,
+            })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                '$schema': 'https://www.speedscope.app/file-format-schema.json',
+                'shared': {'frames': self.__frames},
+                'profiles': profiles,
+                'name': os.path.basename(path),
+                'exporter': 'ontology_enrichment_app',
+            }, f)
+
+    def __run(self):
+        own_thread_id = threading.get_ident()
+        previous = time.perf_counter()
+        while not self.__stop_event.wait(self.__interval):
+            now = time.perf_counter()
+            weight = now - previous
+            previous = now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self.__frame_index(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                stacks, weights = self.__samples.setdefault(thread_id, ([], []))
+                stacks.append(stack)
+                weights.append(weight)
+
+    def __frame_index(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self.__frame_indexes.get(key)
+        if index is None:
+            index = len(self.__frames)
+            self.__frame_indexes[key] = index
+            self.__frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+        return index
+
+
+class ProfilingSession:
+    def __init__(self, config: ProfilingConfig):
+        self.__config = config
+        self.__profiler = None
+        self.__lag_monitor = None
+        self.__previous_debug = False
+
+    async def start(self):
+        if not self.__config.enabled:
+            return
+        global_stage_timers.reset()
+        global_stage_timers.enabled = True
+
+        loop = asyncio.get_running_loop()
+        if self.__config.asyncio_debug:
+            self.__previous_debug = loop.get_debug()
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.__config.slow_callback_ms / 1000
+            asyncio_logger = logging.getLogger("asyncio")
+            for handler in logger.handlers:
+                if handler not in asyncio_logger.handlers:
+                    asyncio_logger.addHandler(handler)
+
+        if self.__config.lag_probe_interval_ms:
+            self.__lag_monitor = EventLoopLagMonitor(self.__config.lag_probe_interval_ms / 1000,
+                                                     self.__config.lag_warning_ms / 1000)
+            self.__lag_monitor.start()
+
+        if self.__config.profiler == 'cprofile':
+            self.__profiler = cProfile.Profile()
+            self.__profiler.enable()
+        elif self.__config.profiler == 'sampling':
+            self.__profiler = SamplingProfiler(self.__config.sampling_interval_ms / 1000)
+            self.__profiler.start()
+
+    async def stop(self):
+        if not self.__config.enabled:
+            return
+        os.makedirs(self.__config.output_dir, exist_ok=True)
+        run_name = os.path.join(self.__config.output_dir, time.strftime('run-%Y%m%dT%H%M%S'))
+
+        if isinstance(self.__profiler, cProfile.Profile):
+            self.__profiler.disable()
+            self.__profiler.dump_stats(run_name + '.pstats')
+        elif isinstance(self.__profiler, SamplingProfiler):
+            self.__profiler.stop()
+            self.__profiler.dump_speedscope(run_name + '.speedscope.json')
+        self.__profiler = None
+
+        report = [f"Profiling report for {run_name}", global_stage_timers.report()]
+        if self.__lag_monitor is not None:
+            await self.__lag_monitor.stop()
+            report.append(self.__lag_monitor.report())
+            self.__lag_monitor = None
+        if self.__config.asyncio_debug:
+            asyncio.get_running_loop().set_debug(self.__previous_debug)
+        global_stage_timers.enabled = False
+
+        report = '\n'.join(report)
+        with open(run_name + '.txt', 'w', encoding='utf-8') as f:
+            f.write(report)
+        logger.info(report)
@@ -0,0 +1,89 @@
+import sys
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+from typing import NamedTuple
+
+
+class Entity(NamedTuple):
+    class_name: str
+    name: str
+    labels: tuple
+
+
+class Relation(NamedTuple):
+    property_name: str
+    subject_name: str
+    object_name: str
+
+
+class DataValue(NamedTuple):
+    property_name: str
+    subject_name: str
+    value: object
+
+
+class ExtractionResult(NamedTuple):
+    entities: tuple
+    relations: tuple
+    data_values: tuple
+
+
+_tuple_new = tuple.__new__
+_intern = sys.intern
+_language = itemgetter(1)
+
+
+def check_names(entities, relations, data_values):
+    class_names, names, labels = zip(*entities) if entities else ((), (), ())
+    property_names, subject_names, _ = zip(*data_values) if data_values else ((), (), ())
+    names = list(chain(class_names, names, map(_language, chain.from_iterable(labels)),
+                       chain.from_iterable(relations), property_names, subject_names))
+    if not all(names):
+        raise ValueError("Extraction result with an empty name or language")
+    _require_strings(names)
+
+
+def _require_strings(values: list):
+    ''.join(values)
+
+
+class RecordCounter:
+    def __init__(self):
+        self.__counters = (Counter(), Counter(), Counter())
+
+    def __len__(self) -> int:
+        return sum(len(counter) for counter in self.__counters)
+
+    def update(self, fields: ExtractionResult):
+        for counter, records in zip(self.__counters, fields):
+            counter.update(records)
+
+    def votes(self) -> int:
+        return sum(sum(counter.values()) for counter in self.__counters)
+
+    def consistent(self, threshold: int) -> ExtractionResult:
+        entities, relations, data_values = (
+            [fields for fields, count in counter.items() if count >= threshold] for counter in self.__counters)
+        return ExtractionResult(tuple([entity(*fields) for fields in entities]),
+                                tuple([relation(*fields) for fields in relations]),
+                                tuple([data_value(*fields) for fields in data_values]))
+
+
+def entity(class_name: str, name: str, labels) -> Entity:
+    labels = tuple([(label[0], _intern(label[1])) for label in labels])
+    if not (class_name and name and all(map(_language, labels))):
+        raise ValueError(f"Entity with an empty class, name or language: {class_name!r}, {name!r}, {labels!r}")
+    return _tuple_new(Entity, (_intern(class_name), _intern(name), labels))
+
+
+def relation(property_name: str, subject_name: str, object_name: str) -> Relation:
+    if not (property_name and subject_name and object_name):
+        raise ValueError(f"Relation with an empty name: {property_name!r}, {subject_name!r}, {object_name!r}")
+    return _tuple_new(Relation, (_intern(property_name), _intern(subject_name), _intern(object_name)))
+
+
+def data_value(property_name: str, subject_name: str, value) -> DataValue:
+    if not (property_name and subject_name):
+        raise ValueError(f"Data value with an empty name: {property_name!r}, {subject_name!r}")
+    return _tuple_new(DataValue, (_intern(property_name), _intern(subject_name), value))
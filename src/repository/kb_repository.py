@@ -1,7 +1,14 @@
 from typing_extensions import Protocol
 
+from src.records import ExtractionResult
+
 
 class KBRepository(Protocol):
-    def add_individuals(self, collection: dict) -> None:
+    def add_individuals(self, collection: ExtractionResult) -> None:
+        ...
+
+    def add_individuals_batch(self, collections: list) -> list:
         ...
 
+    def export(self) -> None:
+        ...
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import queue
+import threading
+
+from src.records import ExtractionResult
+from src.repository.kb_repository import KBRepository
+
+logger = logging.getLogger("app_logger")
+
+_STOP = object()
+_EXPORT = object()
+
+
+class KBWriter:
+    def __init__(self, repository: KBRepository, max_batch_size: int):
+        self.__repository = repository
+        self.__max_batch_size = max_batch_size
+        self.__queue = queue.Queue()
+        self.__thread = None
+
+    def start(self):
+        if self.__thread is None or not self.__thread.is_alive():
+            self.__thread = threading.Thread(target=self.__run, name="kb-writer", daemon=True)
+            self.__thread.start()
+
+    async def add_individuals(self, collection: ExtractionResult):
+        await self.__submit(collection)
+
+    async def export(self):
+        await self.__submit(_EXPORT)
+
+    async def stop(self):
+        if self.__thread is None:
+            return
+        self.__queue.put(_STOP)
+        await asyncio.to_thread(self.__thread.join)
+        self.__thread = None
+
+    def is_running(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    async def __submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__queue.put((item, loop, future))
+        await future
+
+    def __run(self):
+        while True:
+            item = self.__queue.get()
+            if item is _STOP:
+                return
+            if item[0] is _EXPORT:
+                self.__export(item)
+                continue
+            batch = [item]
+            pending = None
+            while len(batch) < self.__max_batch_size:
+                try:
+                    item = self.__queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP or item[0] is _EXPORT:
+                    pending = item
+                    break
+                batch.append(item)
+
+            self.__write_batch(batch)
+            if pending is _STOP:
+                return
+            if pending is not None:
+                self.__export(pending)
+
+    def __write_batch(self, batch: list):
+        try:
+            errors = self.__repository.add_individuals_batch([collection for collection, _, _ in batch])
+        except Exception as e:
+            logger.error("Failed to write batch to the knowledge base", exc_info=True)
+            errors = [e] * len(batch)
+        for (_, loop, future), error in zip(batch, errors):
+            loop.call_soon_threadsafe(KBWriter.__resolve, future, error)
+
+    def __export(self, item):
+        _, loop, future = item
+        error = None
+        try:
+            self.__repository.export()
+        except Exception as e:
+            logger.error("Failed to export the knowledge base", exc_info=True)
+            error = e
+        loop.call_soon_threadsafe(KBWriter.__resolve, future, error)
+
+    @staticmethod
+    def __resolve(future: asyncio.Future, error: Exception | None):
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
@@ -1,103 +1,149 @@
 import logging
+import threading
 
-from owlready2 import Ontology, locstr, ObjectPropertyClass
+from owlready2 import Ontology, Thing, locstr, ObjectPropertyClass
 
 from src.repository.kb_repository import KBRepository
+from src.repository.ontology_store import OntologyStore
 from src.gui.state_manager import global_state_manager
+from src.profiling import global_stage_timers
+from src.records import ExtractionResult
 
 logger = logging.getLogger("app_logger")
 
+_owlready2_lock = threading.RLock()
+
 
 class OntologyOwlready2Repository(KBRepository):
-    def __init__(self, onto: Ontology, save_ontology_path: str):
+    def __init__(self, onto: Ontology, save_ontology_path: str, ontology_store: OntologyStore):
         self.__onto = onto
+        self.__ontology_store = ontology_store
         self.__individuals = {}
         self.__save_ontology_path = save_ontology_path
         self.__param_setters = {
-            1: self.__set_labels
+            2: self.__set_labels
         }
 
     def __set_labels(self, individual, labels):
+        existing_labels = {(str(label), getattr(label, 'lang', '')) for label in individual.label}
         for label in labels:
-            individual.label.append(locstr(label[0], lang=label[1]))
+            if (label[0], label[1]) not in existing_labels:
+                individual.label.append(locstr(label[0], lang=label[1]))
 
     def __save_ontology(self):
-        self.__onto.save(self.__save_ontology_path)
+        self.__ontology_store.save(self.__onto, self.__save_ontology_path)
         for individual in self.__individuals.values():
             global_state_manager.trigger_callback('update_added_individuals_tab', self.__descript_individual(individual))
         global_state_manager.trigger_callback('update_individuals_count', len(self.__individuals))
         self.__individuals = {}
 
-    def add_individuals(self, entities_dict: dict):
-        if entities_dict['objects'] is not None:
-            self.__create_individuals(entities_dict['objects'])
-            if entities_dict['object_properties'] is not None:
-                self.__add_object_properties(entities_dict['object_properties'])
-            if entities_dict['data_properties'] is not None:
-                self.__add_data_properties(entities_dict['data_properties'])
-            self.__save_ontology()
-
-    def __create_individuals(self, individuals_dict: dict):
-        for class_name, individuals_data in individuals_dict.items():
-            with self.__onto:
-                obj_class = getattr(self.__onto, class_name, None)
-                if obj_class is None:
-                    logger.error(f"Class '{class_name}' not found in ontology.")
+    def export(self):
+        with _owlready2_lock:
+            self.__ontology_store.export(self.__onto, self.__save_ontology_path)
+
+    def add_individuals(self, collection: ExtractionResult):
+        error = self.add_individuals_batch([collection])[0]
+        if error is not None:
+            raise error
+
+    def add_individuals_batch(self, collections: list) -> list:
+        with _owlready2_lock:
+            return self.__add_individuals_batch(collections)
+
+    def __add_individuals_batch(self, collections: list) -> list:
+        changed = False
+        errors = []
+        lookups = {}
+        with global_stage_timers.stage('repository.add_individuals'), self.__onto:
+            for collection in collections:
+                errors.append(None)
+                if collection is None:
                     continue
-                for individual_data in individuals_data:
-                    individual = obj_class(individual_data[0])
-                    self.__individuals[individual_data[0]] = individual
-                    for i in range(1, len(individual_data)):
-                        self.__param_setters[i](individual, individual_data[i])
-
-    def __add_object_properties(self, properties_data: dict):
-        for property_name, properties_data in properties_data.items():
-            with self.__onto:
-                prop = getattr(self.__onto, property_name, None)
-                if prop is None:
+                try:
+                    self.__create_individuals(collection.entities, lookups)
+                    self.__add_object_properties(collection.relations, lookups)
+                    self.__add_data_properties(collection.data_values, lookups)
+                except Exception as e:
+                    logger.error("Failed to add a collection to the ontology", exc_info=True)
+                    errors[-1] = e
+                changed = True
+        if changed:
+            with global_stage_timers.stage('repository.save'):
+                self.__save_ontology()
+        return errors
+
+    def __lookup(self, name: str, lookups: dict):
+        if name in lookups:
+            return lookups[name], False
+        entity = lookups[name] = getattr(self.__onto, name, None)
+        return entity, True
+
+    def __create_individuals(self, records: tuple, lookups: dict):
+        for record in records:
+            obj_class, first_lookup = self.__lookup(record.class_name, lookups)
+            if obj_class is None:
+                if first_lookup:
+                    logger.error(f"Class '{record.class_name}' not found in ontology.")
+                continue
+            individual = obj_class(record.name)
+            self.__individuals[record.name] = individual
+            for i in range(2, len(record)):
+                self.__param_setters[i](individual, record[i])
+
+    def __add_object_properties(self, records: tuple, lookups: dict):
+        for property_name, subject_name, object_name in records:
+            prop, first_lookup = self.__lookup(property_name, lookups)
+            if prop is None:
+                if first_lookup:
                     logger.error(f"Object property '{property_name}' not found in ontology.")
                     global_state_manager.trigger_callback('update_errors_tab',
                                                           f"Object property '{property_name}' not found in ontology.")
-
-                for property_data in properties_data:
-                    subject_name, object_name = property_data
-                    if subject_name not in self.__individuals:
-                        logger.error(f"Subject '{subject_name}' for '{property_name}' not found in individuals.")
-                        global_state_manager.trigger_callback('update_errors_tab',
-                                                              f"Subject '{subject_name}' for '{property_name}' not found in individuals.")
-                        continue
-                    if object_name not in self.__individuals:
-                        logger.error(f"Object '{object_name}' for '{property_name}' not found in individuals.")
-                        global_state_manager.trigger_callback('update_errors_tab',
-                                                              f"Object '{object_name}' for '{property_name}' not found in individuals.")
-                        continue
-
-                    prop[self.__individuals[subject_name]].append(self.__individuals[object_name])
-                    global_state_manager.trigger_callback('update_obj_props_count', 1)
-
-    def __add_data_properties(self, properties_data: dict):
-        for property_name, properties_data in properties_data.items():
-            with self.__onto:
-                data_prop = getattr(self.__onto, property_name, None)
-                if data_prop is None:
+                continue
+
+            subject = self.__find_individual(subject_name)
+            if subject is None:
+                logger.error(f"Subject '{subject_name}' for '{property_name}' not found in individuals.")
+                global_state_manager.trigger_callback('update_errors_tab',
+                                                      f"Subject '{subject_name}' for '{property_name}' not found in individuals.")
+                continue
+            obj = self.__find_individual(object_name)
+            if obj is None:
+                logger.error(f"Object '{object_name}' for '{property_name}' not found in individuals.")
+                global_state_manager.trigger_callback('update_errors_tab',
+                                                      f"Object '{object_name}' for '{property_name}' not found in individuals.")
+                continue
+
+            prop[subject].append(obj)
+            global_state_manager.trigger_callback('update_obj_props_count', 1)
+
+    def __add_data_properties(self, records: tuple, lookups: dict):
+        for property_name, object_name, value in records:
+            data_prop, first_lookup = self.__lookup(property_name, lookups)
+            if data_prop is None:
+                if first_lookup:
                     logger.error(f"Data property '{property_name}' not found in ontology.")
-                    continue
-                for property_data in properties_data:
-                    object_name, value = property_data
-                    if object_name not in self.__individuals:
-                        logger.error(f"Object '{object_name}' for '{property_name}' not found in individuals.")
-                        global_state_manager.trigger_callback('update_errors_tab',
-                                                              f"Object '{object_name}' for '{property_name}' not found in individuals.")
-                        continue
-
-                    try:
-                        data_prop[self.__individuals[object_name]] = [value]
-                        global_state_manager.trigger_callback('update_data_props_count', 1)
-                    except ValueError as e:
-                        logger.error(f"Type validation error for '{object_name}': {e}")
-                        global_state_manager.trigger_callback('update_errors_tab',
-                                                              f"Type validation error for '{object_name}': {e}")
-                        continue
+                continue
+            individual = self.__find_individual(object_name)
+            if individual is None:
+                logger.error(f"Object '{object_name}' for '{property_name}' not found in individuals.")
+                global_state_manager.trigger_callback('update_errors_tab',
+                                                      f"Object '{object_name}' for '{property_name}' not found in individuals.")
+                continue
+
+            try:
+                data_prop[individual] = [value]
+                global_state_manager.trigger_callback('update_data_props_count', 1)
+            except ValueError as e:
+                logger.error(f"Type validation error for '{object_name}': {e}")
+                global_state_manager.trigger_callback('update_errors_tab',
+                                                      f"Type validation error for '{object_name}': {e}")
+                continue
+
+    def __find_individual(self, name: str):
+        individual = self.__individuals.get(name)
+        if individual is None:
+            individual = self.__onto[name]
+        return individual if isinstance(individual, Thing) else None
 
     def __descript_individual(self, individual):
         individual_name = individual.name
@@ -0,0 +1,175 @@
+import json
+import logging
+import os
+import uuid
+from typing import TYPE_CHECKING
+
+from src.config import OntologyStoreConfig
+from src.exception.input_exception import InputError
+
+if TYPE_CHECKING:
+    from owlready2 import Ontology
+
+logger = logging.getLogger("app_logger")
+
+
+class OntologyStore:
+    def __init__(self, config: OntologyStoreConfig):
+        self.__quadstore_enabled = config.quadstore_enabled
+        self.__quadstore_dir = os.path.abspath(config.quadstore_dir)
+        self.__loaded = {}
+        self.__quadstores = {}
+
+    def load(self, path: str) -> 'Ontology':
+        path = os.path.abspath(path)
+        try:
+            fingerprint = OntologyStore.__fingerprint(path)
+            cached = self.__loaded.get(path)
+            if cached is not None and cached[1] == fingerprint:
+                return cached[0]
+
+            if self.__quadstore_enabled:
+                self.__recover_unexported()
+                fingerprint = OntologyStore.__fingerprint(path)
+                onto = self.__load_from_quadstore(path, fingerprint)
+            else:
+                from owlready2 import get_ontology
+                onto = get_ontology(path).load()
+        except Exception:
+            logger.error(f"Failed to load ontology {path}", exc_info=True)
+            raise InputError("Failed to load ontology. Please check the path and try again.")
+
+        self.__loaded[path] = (onto, fingerprint)
+        return onto
+
+    def save(self, onto: 'Ontology', save_path: str):
+        quadstore = self.__quadstores.get(onto)
+        if quadstore is None:
+            onto.save(save_path)
+            self.__forget(onto)
+            return
+
+        if quadstore['mirrors'] or not quadstore.get('unexported'):
+            if quadstore['mirrors']:
+                self.__forget(onto)
+            save_path = os.path.abspath(save_path)
+            quadstore['mirrors'] = {}
+            quadstore['unexported'] = {'save_path': save_path,
+                                       'save_path_fingerprint': OntologyStore.__fingerprint(save_path)
+                                       if os.path.exists(save_path) else None}
+            OntologyStore.__write_meta(quadstore)
+        onto.world.save()
+
+    def export(self, onto: 'Ontology', save_path: str):
+        quadstore = self.__quadstores.get(onto)
+        if quadstore is None:
+            onto.save(save_path)
+            return
+
+        save_path = os.path.abspath(save_path)
+        onto.world.save()
+        onto.save(save_path)
+        fingerprint = OntologyStore.__fingerprint(save_path)
+        quadstore['mirrors'] = {save_path: fingerprint}
+        quadstore['unexported'] = None
+        OntologyStore.__write_meta(quadstore)
+        self.__loaded[save_path] = (onto, fingerprint)
+
+    def is_quadstore_backed(self, onto: 'Ontology') -> bool:
+        return onto in self.__quadstores
+
+    def __load_from_quadstore(self, path: str, fingerprint: list) -> 'Ontology':
+        from owlready2 import World
+        os.makedirs(self.__quadstore_dir, exist_ok=True)
+        open_files = {quadstore['filename'] for quadstore in self.__quadstores.values()}
+
+        for meta_path in self.__meta_paths():
+            meta = OntologyStore.__read_meta(meta_path)
+            if meta is None or meta['filename'] in open_files:
+                continue
+            if meta['mirrors'].get(path) == fingerprint and os.path.exists(meta['filename']):
+                world = World(filename=meta['filename'])
+                onto = world.get_ontology(meta['ontology_iri'])
+                self.__quadstores[onto] = meta
+                logger.info(f"Ontology {path} reopened from quadstore {meta['filename']}")
+                return onto
+            if not meta['mirrors'] and not meta.get('unexported'):
+                OntologyStore.__remove_quadstore(meta)
+
+        filename = os.path.join(self.__quadstore_dir, f"{uuid.uuid4().hex}.sqlite3")
+        world = World(filename=filename)
+        onto = world.get_ontology(path).load()
+        world.save()
+        meta = {'filename': filename, 'meta_path': filename + '.json', 'ontology_iri': onto.base_iri,
+                'mirrors': {path: fingerprint}, 'unexported': None}
+        OntologyStore.__write_meta(meta)
+        self.__quadstores[onto] = meta
+        logger.info(f"Ontology {path} imported into quadstore {filename}")
+        return onto
+
+    def __recover_unexported(self):
+        os.makedirs(self.__quadstore_dir, exist_ok=True)
+        open_files = {quadstore['filename'] for quadstore in self.__quadstores.values()}
+        for meta_path in self.__meta_paths():
+            meta = OntologyStore.__read_meta(meta_path)
+            if meta is None or meta['filename'] in open_files or not meta.get('unexported'):
+                continue
+            if not os.path.exists(meta['filename']):
+                logger.error(f"Quadstore {meta['filename']} with unexported enrichment is missing")
+                continue
+            self.__export_unexported(meta)
+
+    @staticmethod
+    def __export_unexported(meta: dict):
+        from owlready2 import World
+        save_path = meta['unexported']['save_path']
+        if os.path.exists(save_path) and \
+                OntologyStore.__fingerprint(save_path) != meta['unexported']['save_path_fingerprint']:
+            stem, extension = os.path.splitext(save_path)
+            save_path = f"{stem}.recovered{extension}"
+        world = World(filename=meta['filename'])
+        try:
+            world.get_ontology(meta['ontology_iri']).save(save_path)
+        finally:
+            world.close()
+        meta['mirrors'] = {save_path: OntologyStore.__fingerprint(save_path)}
+        meta['unexported'] = None
+        OntologyStore.__write_meta(meta)
+        logger.warning(f"Quadstore {meta['filename']} held enrichment that was never exported, "
+                       f"it was exported to {save_path}")
+
+    def __forget(self, onto: 'Ontology'):
+        self.__loaded = {path: cached for path, cached in self.__loaded.items() if cached[0] is not onto}
+
+    def __meta_paths(self):
+        return [os.path.join(self.__quadstore_dir, name) for name in os.listdir(self.__quadstore_dir)
+                if name.endswith('.sqlite3.json')]
+
+    @staticmethod
+    def __fingerprint(path: str) -> list:
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    @staticmethod
+    def __read_meta(meta_path: str) -> dict | None:
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            logger.error(f"Broken quadstore metadata {meta_path}", exc_info=True)
+            return None
+
+    @staticmethod
+    def __write_meta(meta: dict):
+        tmp_path = meta['meta_path'] + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta['meta_path'])
+
+    @staticmethod
+    def __remove_quadstore(meta: dict):
+        for path in (meta['filename'], meta['meta_path']):
+            try:
+                os.remove(path)
+            except OSError:
+                logger.error(f"Failed to remove stale quadstore file {path}", exc_info=True)
@@ -0,0 +1,126 @@
+import logging
+import os
+import re
+import time
+import uuid
+from urllib.parse import quote, unquote
+
+from src.records import ExtractionResult
+from src.repository.kb_repository import KBRepository
+from src.gui.state_manager import global_state_manager
+
+logger = logging.getLogger("app_logger")
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+SEGMENT_SUFFIX = ".nq"
+PARTIAL_SEGMENT_SUFFIX = ".nq.part"
+
+_LITERAL_ESCAPES = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r'})
+_LITERAL_UNESCAPES = {'\\\\': '\\', '\\"': '"', '\\n': '\n', '\\r': '\r'}
+_LANG_PATTERN = re.compile(r'^[A-Za-z]+(-[A-Za-z0-9]+)*$')
+_QUAD_PATTERN = re.compile(r'^<([^>]*)> <([^>]*)> (?:<([^>]*)>|"((?:[^"\\]|\\.)*)"(?:@([\w-]+))?) <([^>]*)> \.$')
+
+
+def encode_name(base_iri: str, name: str) -> str:
+    return base_iri + quote(name, safe='')
+
+
+def decode_name(base_iri: str, iri: str) -> str | None:
+    if not iri.startswith(base_iri):
+        return None
+    return unquote(iri[len(base_iri):])
+
+
+def escape_literal(value) -> str:
+    return str(value).translate(_LITERAL_ESCAPES)
+
+
+def parse_quad(line: str):
+    match = _QUAD_PATTERN.match(line.strip())
+    if match is None:
+        return None
+    subject, predicate, object_iri, literal, lang, graph = match.groups()
+    if literal is not None:
+        literal = re.sub(r'\\[\\"nr]', lambda escape: _LITERAL_UNESCAPES[escape.group(0)], literal)
+    return subject, predicate, object_iri, literal, lang, graph
+
+
+class TripleLogRepository(KBRepository):
+    def __init__(self, log_dir: str, base_iri: str):
+        self.__log_dir = log_dir
+        self.__base_iri = base_iri
+        self.__segment = None
+        self.__start_segment()
+
+    def add_individuals(self, collection: ExtractionResult):
+        error = self.add_individuals_batch([collection])[0]
+        if error is not None:
+            raise error
+
+    def add_individuals_batch(self, collections: list) -> list:
+        lines = []
+        errors = []
+        individuals_count = object_properties_count = data_properties_count = 0
+        for collection in collections:
+            if collection is None:
+                errors.append(None)
+                continue
+            try:
+                collection_lines = self.__collection_lines(collection)
+            except Exception as e:
+                logger.error("Failed to convert a collection to N-Quads", exc_info=True)
+                errors.append(e)
+                continue
+            errors.append(None)
+            lines += collection_lines
+            individuals_count += len(collection.entities)
+            object_properties_count += len(collection.relations)
+            data_properties_count += len(collection.data_values)
+
+        if not lines:
+            return errors
+        if self.__segment is None:
+            os.makedirs(self.__log_dir, exist_ok=True)
+            self.__segment = open(self.__segment_path, 'ab')
+        self.__segment.write(''.join(lines).encode('utf-8'))
+        self.__segment.flush()
+
+        global_state_manager.trigger_callback('update_individuals_count', individuals_count)
+        global_state_manager.trigger_callback('update_obj_props_count', object_properties_count)
+        global_state_manager.trigger_callback('update_data_props_count', data_properties_count)
+        return errors
+
+    def __collection_lines(self, collection: ExtractionResult) -> list:
+        lines = []
+        for class_name, name, labels in collection.entities:
+            subject = self.__iri(name)
+            lines.append(f"{subject} <{RDF_TYPE}> {self.__iri(class_name)} {self.__graph} .\n")
+            for label, lang in labels:
+                lang_tag = f"@{lang}" if _LANG_PATTERN.match(lang) else ""
+                lines.append(f'{subject} <{RDFS_LABEL}> "{escape_literal(label)}"{lang_tag} {self.__graph} .\n')
+        for property_name, subject_name, object_name in collection.relations:
+            lines.append(f"{self.__iri(subject_name)} {self.__iri(property_name)} "
+                         f"{self.__iri(object_name)} {self.__graph} .\n")
+        for property_name, object_name, value in collection.data_values:
+            lines.append(f'{self.__iri(object_name)} {self.__iri(property_name)} '
+                         f'"{escape_literal(value)}" {self.__graph} .\n')
+        return lines
+
+    def export(self):
+        if self.__segment is None:
+            return
+        os.fsync(self.__segment.fileno())
+        self.__segment.close()
+        self.__segment = None
+        os.replace(self.__segment_path, self.__segment_path[:-len(PARTIAL_SEGMENT_SUFFIX)] + SEGMENT_SUFFIX)
+        logger.info(f"Triple log segment {self.__run_id} closed.")
+        self.__start_segment()
+
+    def __start_segment(self):
+        self.__run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.__graph = f"<urn:ontology-enrichment:run:{self.__run_id}>"
+        self.__segment_path = os.path.join(self.__log_dir, self.__run_id + PARTIAL_SEGMENT_SUFFIX)
+
+    def __iri(self, name: str) -> str:
+        return f"<{encode_name(self.__base_iri, name)}>"
@@ -0,0 +1,38 @@
+from collections import Counter
+
+from src.records import Entity, ExtractionResult, Relation, DataValue
+
+
+class DocumentResultAggregator:
+    def __init__(self):
+        self.__objects = {}
+        self.__relations = set()
+        self.__data_values = set()
+        self.__canonical_names = {}
+
+    def add(self, chunk_result: ExtractionResult | None):
+        if not chunk_result:
+            return
+        for class_name, name, labels in chunk_result.entities:
+            name = self.__canonical_names.setdefault(name.casefold(), name)
+            label_counters = self.__objects.setdefault((class_name, name), {})
+            for label, lang in labels:
+                label_counters.setdefault(lang, Counter())[label] += 1
+        self.__relations.update(chunk_result.relations)
+        self.__data_values.update(chunk_result.data_values)
+
+    def result(self) -> ExtractionResult | None:
+        if not self.__objects and not self.__relations and not self.__data_values:
+            return None
+        return ExtractionResult(
+            tuple(Entity(class_name, name,
+                         tuple((counter.most_common(1)[0][0], lang) for lang, counter in label_counters.items()))
+                  for (class_name, name), label_counters in self.__objects.items()),
+            tuple({Relation(property_name, self.__resolve_name(subject_name), self.__resolve_name(object_name))
+                   for property_name, subject_name, object_name in self.__relations}),
+            tuple({DataValue(property_name, self.__resolve_name(subject_name), value)
+                   for property_name, subject_name, value in self.__data_values}),
+        )
+
+    def __resolve_name(self, name: str) -> str:
+        return self.__canonical_names.get(name.casefold(), name)
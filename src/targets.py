@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+
+import yaml
+
+from src.exception.input_exception import InputError
+from src.prompt_generator import generate_prompt
+
+
+def prompt_from_file(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def targets_from_file(file_path, ontology_store):
+    InputValidator.validate_read_path(file_path)
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            entries = yaml.safe_load(f)['targets']
+    except (yaml.YAMLError, KeyError, TypeError):
+        raise InputError("The targets file must be a YAML file with a 'targets' list.")
+
+    targets = []
+    for entry in entries:
+        if not isinstance(entry, dict) or 'ontology' not in entry or 'save_path' not in entry:
+            raise InputError("Every target needs 'ontology' and 'save_path' entries.")
+        onto = ontology_store.load(entry['ontology'])
+        InputValidator.validate_save_path(entry['save_path'])
+        if 'prompt' in entry:
+            prompt = entry['prompt']
+        elif 'prompt_file' in entry:
+            InputValidator.validate_read_path(entry['prompt_file'])
+            prompt = prompt_from_file(entry['prompt_file'])
+        else:
+            prompt = generate_prompt(onto)
+        targets.append((prompt, onto, entry['save_path']))
+    return targets
+
+
+class InputValidator:
+    @staticmethod
+    def validate_save_path(save_path):
+        directory = Path(save_path).parent
+        if not directory.exists():
+            raise InputError("The specified directory for saving the ontology does not exist.")
+        if not os.access(directory, os.W_OK):
+            raise InputError("No write permission for the specified directory.")
+
+    @staticmethod
+    def validate_read_path(read_path):
+        path = Path(read_path)
+        if not path.is_file():
+            raise InputError("The specified file path does not exist or is not a file.")
+        if not os.access(path, os.R_OK):
+            raise InputError("The file is not accessible. Please check read permissions.")
+
+    @staticmethod
+    def validate_place_entry(place):
+        if not place:
+            raise InputError("The place field (URL or Path) is empty. Please provide a valid place.")
@@ -1,21 +1,45 @@
 import asyncio
+import copy
+import hashlib
 import json
 import logging
 import os
 import re
-from collections import Counter
+from operator import itemgetter
 from typing import Protocol, Collection
 
-import tiktoken
 from openai import AsyncOpenAI
 from typing_extensions import override
 
+from src.chunk_manifest import ChunkManifest, chunk_hash
 from src.config import ChatGptClientConfig, TextProcessorConfig
+from src.escalation_policy import EscalationPolicy
 from src.exception.data_exception import JsonNotFountError, WrongJsonStructureError
 from src.gui.state_manager import global_state_manager
+from src.known_entity_matcher import KnownEntityMatcher
+from src.profiling import global_stage_timers
+from src.records import ExtractionResult, RecordCounter, check_names
+from src.tokenizer import encoding_for_model
 
 logger = logging.getLogger("app_logger")
 
+_label_fields = itemgetter(0, 1)
+
+PACKED_DOCUMENTS_INSTRUCTION = (
+    "The text below consists of several independent documents. "
+    "Each document starts with a line '### DOCUMENT <number>' and ends with a line '### END OF DOCUMENT <number>'. "
+    "Process every document separately and return a single JSON object in this format:\n"
+    '{"documents": [{"document": <number>, "objects": [...], "object_properties": [...], "data_properties": [...]},]}\n'
+    "Relations and data properties must only refer to individuals found in the same document.\n\n"
+)
+KNOWN_ENTITIES_INSTRUCTION = (
+    "\n\nThe following individuals mentioned in the text already exist in the knowledge base. "
+    'Do not return them in "objects". When they take part in relationships or data properties, '
+    "use the ID given in square brackets as their English name:\n"
+)
+PACKED_DOCUMENT_HEADER = "### DOCUMENT {}\n"
+PACKED_DOCUMENT_FOOTER = "\n### END OF DOCUMENT {}\n\n"
+
 
 class LLMClientProtocol(Protocol):
 
@@ -28,68 +52,52 @@ class LLMClientProtocol(Protocol):
     def get_available_token_count(self) -> int:
         ...
 
+    def with_prompt(self, prompt_instruction: str) -> 'LLMClientProtocol':
+        ...
+
 
 class JsonAdapterProtocol(Protocol):
 
-    def map_json(self, data: dict) -> dict:
+    def map_json(self, data: dict) -> ExtractionResult:
         ...
 
 
 class DefaultJsonAdapter(JsonAdapterProtocol):
 
     @override
-    def map_json(self, choice: dict) -> dict:
+    def map_json(self, choice: dict) -> ExtractionResult:
         try:
-            result = {'objects': {}, 'object_properties': {}, 'data_properties': {}}
-            if 'objects' in choice and choice['objects']:
-                DefaultJsonAdapter.__map_objects(choice['objects'], result['objects'])
-                if 'object_properties' in choice and choice['object_properties']:
-                    DefaultJsonAdapter.__map_object_properties(choice['object_properties'], result['object_properties'])
-                if 'data_properties' in choice and choice['data_properties']:
-                    DefaultJsonAdapter.__map_data_properties(choice['data_properties'], result['data_properties'])
-            return result
+            entities = {(obj[0], obj[1], tuple(map(_label_fields, obj[2]))) for obj in choice.get('objects') or ()}
+            relations = {(obj_prop[0], obj_prop[1][0], obj_prop[1][1])
+                         for obj_prop in choice.get('object_properties') or ()}
+            data_values = {(data_prop[0], data_prop[1][0], data_prop[1][1])
+                           for data_prop in choice.get('data_properties') or ()}
+            check_names(entities, relations, data_values)
+            return ExtractionResult(entities, relations, data_values)
 
         except Exception:
-            raise WrongJsonStructureError
-
-    @staticmethod
-    def __map_objects(objects: dict, result_objects: dict):
-        for obj in objects:
-            if obj[0] not in result_objects:
-                result_objects[obj[0]] = {(obj[1], tuple(tuple(label) for label in obj[2]))}
-            else:
-                result_objects[obj[0]].add((obj[1], tuple(tuple(label) for label in obj[2])))
-
-    @staticmethod
-    def __map_object_properties(object_properties: dict, result_object_properties: dict):
-        for obj_prop in object_properties:
-            subject_name, object_name = obj_prop[1][0], obj_prop[1][1]
-            if obj_prop[0] not in result_object_properties:
-                result_object_properties[obj_prop[0]] = {(subject_name, object_name)}
-            else:
-                result_object_properties[obj_prop[0]].add((subject_name, object_name))
-
-    @staticmethod
-    def __map_data_properties(data_properties: dict, result_data_properties: dict):
-        for data_prop in data_properties:
-            object_name, value = data_prop[1]
-            if data_prop[0] not in result_data_properties:
-                result_data_properties[data_prop[0]] = {(object_name, value)}
-            else:
-                result_data_properties[data_prop[0]].add((object_name, value))
+            raise WrongJsonStructureError(choice)
 
 
 class ChatGptClient(LLMClientProtocol):
-    def __init__(self, config: ChatGptClientConfig, prompt_instruction: str):
+    def __init__(self, config: ChatGptClientConfig, prompt_instruction: str, client: AsyncOpenAI | None = None):
         self.__prompt_instruction = prompt_instruction
         self.__num_responses = config.num_responses
         self.__system_message = config.system_message
         self.__model = config.model
         self.__temperature = config.temperature
-        self.__encoding = tiktoken.encoding_for_model(config.model)
+        self.__encoding = encoding_for_model(config.model)
         self.__available_token_count = config.model_tokens_limitation - self.count_tokens(
             self.__prompt_instruction) - self.count_tokens(self.__system_message) - 5
-        self.__client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.__client = client or AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+    @override
+    def with_prompt(self, prompt_instruction: str) -> LLMClientProtocol:
+        client = copy.copy(self)
+        client.__prompt_instruction = prompt_instruction
+        client.__available_token_count = self.__available_token_count + self.count_tokens(
+            self.__prompt_instruction) - self.count_tokens(prompt_instruction)
+        return client
 
     @override
     async def get_response(self, text: str) -> Collection[str]:
@@ -116,41 +124,217 @@ class ChatGptClient(LLMClientProtocol):
 
 
 class TextProcessor:
-    def __init__(self, config: TextProcessorConfig, llm_client: LLMClientProtocol, json_adapter: JsonAdapterProtocol):
+    def __init__(self, config: TextProcessorConfig, llm_client: LLMClientProtocol, json_adapter: JsonAdapterProtocol,
+                 known_entity_matcher: KnownEntityMatcher | None = None, semaphore: asyncio.Semaphore | None = None,
+                 escalation_policy: EscalationPolicy | None = None):
         self.__threshold = config.threshold
         self.__overlap_sentences = config.overlap_sentences
         self.__separators = config.separators
-        self.__semaphore = asyncio.Semaphore(config.text_processor_semaphore_size)
+        self.__content_defined_chunking = config.content_defined_chunking
+        self.__min_chunk_tokens = config.min_chunk_tokens
+        self.__target_chunk_tokens = config.target_chunk_tokens
+        self.__semaphore = semaphore or asyncio.Semaphore(config.text_processor_semaphore_size)
 
         self.__llm_client = llm_client
         self.__json_adapter = json_adapter
+        self.__escalation_policy = escalation_policy
         self.__tokens_limitation = llm_client.get_available_token_count()
 
-    async def process_text(self, text: str):
-        chunks = self.__split_text_into_chunks(text)
-        tasks = [asyncio.create_task(self.__process_chunk(chunk)) for chunk in chunks]
-        return tasks
+        self.__known_entity_matcher = known_entity_matcher
+        self.__known_entities_token_budget = config.known_entities_token_budget if known_entity_matcher else 0
+        self.__tokens_limitation -= self.__known_entities_token_budget
+
+        self.__document_packing = config.document_packing
+        self.__packing_max_document_tokens = config.packing_max_document_tokens
+        self.__packing_max_documents = config.packing_max_documents
+        self.__packing_token_budget = self.__tokens_limitation - llm_client.count_tokens(PACKED_DOCUMENTS_INSTRUCTION)
+        self.__packing_delimiter_tokens = llm_client.count_tokens(
+            PACKED_DOCUMENT_HEADER.format(self.__packing_max_documents) +
+            PACKED_DOCUMENT_FOOTER.format(self.__packing_max_documents))
+        self.__open_pack = []
+        self.__open_pack_tokens = 0
+
+    async def process_text(self, text: str, manifest: ChunkManifest | None = None):
+        with global_stage_timers.stage('text_processor.split'):
+            chunks = self.split_text(text)
+        return self.process_chunks(chunks, manifest)
+
+    def process_chunks(self, chunks: list, manifest: ChunkManifest | None = None):
+        if manifest is None:
+            return [asyncio.create_task(self.__process_chunk(chunk)) for chunk in chunks]
+        return [asyncio.create_task(self.__process_chunk_with_manifest(chunk, manifest)) for chunk in chunks]
+
+    async def __process_chunk_with_manifest(self, chunk: str, manifest: ChunkManifest):
+        key = chunk_hash(chunk)
+        if key in manifest:
+            return manifest.get(key)
+        result = await self.__process_chunk(chunk)
+        manifest.put(key, result)
+        return result
+
+    async def __process_chunk(self, chunk: str, tier: int = 0):
+        request_text = self.__annotate_known_entities(chunk, chunk)
+        while True:
+            response = await self.__request(request_text, tier)
+            with global_stage_timers.stage('process_chunk.consensus'):
+                counter = RecordCounter()
+                valid_choices = 0
+                for choice in response:
+                    json_choice = self.__parse_choice(choice)
+                    if json_choice is not None and self.__count_choice(json_choice, choice, counter):
+                        valid_choices += 1
+                result = self.__make_consistent(counter)
+            if self.__escalation_policy is None:
+                return result
+            reason = self.__escalation_reason(tier, len(response), valid_choices, counter, result)
+            if reason is None:
+                self.__llm_client.record_answer(tier)
+                return result
+            self.__llm_client.record_escalation(tier, reason)
+            tier += 1
+
+    async def __request(self, text: str, tier: int):
+        with global_stage_timers.stage('process_chunk.semaphore_wait'):
+            await self.__semaphore.acquire()
+        try:
+            with global_stage_timers.stage('process_chunk.llm'):
+                if self.__escalation_policy is None:
+                    return await self.__llm_client.get_response(text)
+                return await self.__llm_client.get_tier_response(tier, text)
+        finally:
+            self.__semaphore.release()
+
+    def __escalation_reason(self, tier: int, choices: int, valid_choices: int, counter: RecordCounter,
+                            result: ExtractionResult | None) -> str | None:
+        if tier + 1 >= self.__llm_client.tier_count():
+            return None
+        return self.__escalation_policy.escalation_reason(
+            choices, valid_choices, TextProcessor.__agreement(counter, valid_choices), result)
 
-    async def __process_chunk(self, chunk: str):
+    @staticmethod
+    def __agreement(counter: RecordCounter, valid_choices: int) -> float:
+        if valid_choices < 2 or not counter:
+            return 1.0
+        return counter.votes() / (len(counter) * valid_choices)
+
+    def split_text(self, text: str):
+        return self.__split_text_into_chunks(text)
+
+    def get_tokens_limitation(self) -> int:
+        return self.__tokens_limitation
+
+    def try_pack_document(self, place: str, text: str, token_count: int | None = None):
+        if not self.__document_packing:
+            return None
+        if token_count is None:
+            token_count = self.__llm_client.count_tokens(text)
+        token_count += self.__packing_delimiter_tokens
+        if token_count > self.__packing_max_document_tokens or token_count > self.__packing_token_budget:
+            return None
+
+        full_packs = []
+        if self.__open_pack_tokens + token_count > self.__packing_token_budget:
+            full_packs.append(self.__take_open_pack())
+        self.__open_pack.append((place, text))
+        self.__open_pack_tokens += token_count
+        if len(self.__open_pack) >= self.__packing_max_documents:
+            full_packs.append(self.__take_open_pack())
+        return full_packs
+
+    def flush_document_pack(self):
+        return [self.__take_open_pack()] if self.__open_pack else []
+
+    def __take_open_pack(self):
+        pack = self.__open_pack
+        self.__open_pack = []
+        self.__open_pack_tokens = 0
+        return pack
+
+    async def process_document_pack(self, pack: list):
+        packed_text = PACKED_DOCUMENTS_INSTRUCTION + ''.join(
+            PACKED_DOCUMENT_HEADER.format(number) + text + PACKED_DOCUMENT_FOOTER.format(number)
+            for number, (_, text) in enumerate(pack, start=1))
         async with self.__semaphore:
-            response = await self.__llm_client.get_response(chunk)
-        counter_dict = {'objects': Counter(), 'object_properties': Counter(), 'data_properties': Counter()}
+            response = await self.__llm_client.get_response(
+                self.__annotate_known_entities(packed_text, ''.join(text for _, text in pack)))
+
+        counters = [RecordCounter() for _ in pack]
+        valid_choices = 0
         for choice in response:
-            try:
-                json_choice = TextProcessor.__extract_json(choice)
-                self.__add_choice_to_counter(self.__json_adapter.map_json(json_choice), counter_dict)
-            except json.JSONDecodeError as e:
-                logger.error("", exc_info=True)
-                global_state_manager.trigger_callback('update_errors_tab',
-                                                      "Wrong Chat GPT response structure:\n" + choice)
+            json_choice = self.__parse_choice(choice)
+            if json_choice is None:
                 continue
-            except WrongJsonStructureError as e:
-                logger.error("", exc_info=True)
+            documents = json_choice.get('documents') if isinstance(json_choice, dict) else None
+            if not isinstance(documents, list):
+                logger.error(f"Packed response without documents list: {choice}")
                 global_state_manager.trigger_callback('update_errors_tab',
-                                                      "Wrong JSON structure in Chat GPT response:\n" + json_choice)
+                                                      "Wrong JSON structure in Chat GPT response:\n" + choice)
                 continue
-        if counter_dict['objects']:
-            return self.__make_consistent(counter_dict)
+            valid_choices += 1
+            for document in documents:
+                number = document.get('document') if isinstance(document, dict) else None
+                if not isinstance(number, int) or not 1 <= number <= len(pack):
+                    logger.error(f"Unknown document number in packed response: {document}")
+                    continue
+                self.__count_choice(document, choice, counters[number - 1])
+
+        results = [(place, self.__make_consistent(counter)) for (place, _), counter in zip(pack, counters)]
+        if self.__escalation_policy is None:
+            return results
+        return await self.__escalate_pack_documents(pack, results, counters, len(response), valid_choices)
+
+    async def __escalate_pack_documents(self, pack: list, results: list, counters: list, choices: int,
+                                        valid_choices: int):
+        escalated = {}
+        for index, ((_, text), (_, result), counter) in enumerate(zip(pack, results, counters)):
+            reason = self.__escalation_reason(0, choices, valid_choices, counter, result)
+            if reason is None:
+                self.__llm_client.record_answer(0)
+            else:
+                self.__llm_client.record_escalation(0, reason)
+                escalated[index] = asyncio.create_task(self.__process_chunk(text, 1))
+        for index, task in escalated.items():
+            results[index] = (results[index][0], await task)
+        return results
+
+    def __annotate_known_entities(self, request_text: str, source_text: str) -> str:
+        if self.__known_entity_matcher is None:
+            return request_text
+        known_entities = self.__known_entity_matcher.find(source_text)
+        if not known_entities:
+            return request_text
+
+        lines = []
+        token_count = self.__llm_client.count_tokens(KNOWN_ENTITIES_INSTRUCTION)
+        for entity in known_entities:
+            line = f"[{entity.id}] {entity.label} ({', '.join(entity.class_names)})\n"
+            token_count += self.__llm_client.count_tokens(line)
+            if token_count > self.__known_entities_token_budget:
+                break
+            lines.append(line)
+        if not lines:
+            return request_text
+        return request_text + KNOWN_ENTITIES_INSTRUCTION + ''.join(lines)
+
+    @staticmethod
+    def __parse_choice(choice: str):
+        try:
+            return TextProcessor.__extract_json(choice)
+        except (json.JSONDecodeError, JsonNotFountError):
+            logger.error("", exc_info=True)
+            global_state_manager.trigger_callback('update_errors_tab',
+                                                  "Wrong Chat GPT response structure:\n" + choice)
+            return None
+
+    def __count_choice(self, json_choice: dict, choice: str, counter: RecordCounter) -> bool:
+        try:
+            counter.update(self.__json_adapter.map_json(json_choice))
+            return True
+        except WrongJsonStructureError:
+            logger.error("", exc_info=True)
+            global_state_manager.trigger_callback('update_errors_tab',
+                                                  "Wrong JSON structure in Chat GPT response:\n" + choice)
+            return False
 
     @staticmethod
     def __extract_json(choice: str):
@@ -163,27 +347,13 @@ class TextProcessor:
         else:
             raise JsonNotFountError(choice)
 
-    def __make_consistent(self, counters_dict: dict):
-        result = {'objects': {}, 'object_properties': {}, 'data_properties': {}}
-        for entity_type, classes in counters_dict.items():
-            for class_name, entities in classes.items():
-                for entity, count in entities.items():
-                    if count >= self.__threshold:
-                        if class_name not in result[entity_type]:
-                            result[entity_type][class_name] = {entity}
-                        result[entity_type][class_name].add(entity)
+    def __make_consistent(self, counter: RecordCounter) -> ExtractionResult | None:
+        result = counter.consistent(self.__threshold)
+        if not any(result):
+            return None
         global_state_manager.trigger_callback('update_ChatGPT_response_tab', result)
         return result
 
-    @staticmethod
-    def __add_choice_to_counter(choice, counters_dict: dict):
-        for entity_type, classes in choice.items():
-            for class_name, entities in classes.items():
-                if class_name not in counters_dict[entity_type]:
-                    counters_dict[entity_type][class_name] = Counter(entities)
-                else:
-                    counters_dict[entity_type][class_name].update(entities)
-
     def __is_within_limit(self, text: str):
         token_count = self.__llm_client.count_tokens(text)
         return token_count <= self.__tokens_limitation
@@ -191,9 +361,12 @@ class TextProcessor:
     def __split_into_sentences(self, text):
         pattern = '|'.join(map(re.escape, self.__separators))
         sentences = re.split(f'({pattern})', text)
-        return [''.join(pair) for pair in zip(sentences[::2], sentences[1::2])]
+        tail = [sentences[-1]] if sentences[-1] else []
+        return [''.join(pair) for pair in zip(sentences[::2], sentences[1::2])] + tail
 
     def __split_text_into_chunks(self, text: str):
+        if self.__content_defined_chunking:
+            return self.__split_text_into_content_defined_chunks(text)
         if self.__is_within_limit(text):
             return [text]
 
@@ -217,3 +390,38 @@ class TextProcessor:
         if current_chunk:
             chunks.append(''.join(current_chunk))
         return chunks
+
+    def __split_text_into_content_defined_chunks(self, text: str):
+        chunks = []
+        current_chunk = []
+        current_token_count = 0
+        new_sentences = 0
+
+        for sentence in self.__split_into_sentences(text):
+            sentence_token_count = self.__llm_client.count_tokens(sentence)
+            if new_sentences and current_token_count + sentence_token_count > self.__tokens_limitation:
+                chunks.append(''.join(current_chunk))
+                current_chunk, current_token_count = self.__overlap(current_chunk)
+                new_sentences = 0
+
+            current_chunk.append(sentence)
+            current_token_count += sentence_token_count
+            new_sentences += 1
+            if current_token_count >= self.__min_chunk_tokens and \
+                    TextProcessor.__is_chunk_boundary(sentence, sentence_token_count, self.__target_chunk_tokens):
+                chunks.append(''.join(current_chunk))
+                current_chunk, current_token_count = self.__overlap(current_chunk)
+                new_sentences = 0
+
+        if new_sentences:
+            chunks.append(''.join(current_chunk))
+        return chunks
+
+    def __overlap(self, chunk: list):
+        overlap = chunk[-self.__overlap_sentences:] if self.__overlap_sentences else []
+        return overlap, self.__llm_client.count_tokens(''.join(overlap))
+
+    @staticmethod
+    def __is_chunk_boundary(sentence: str, sentence_token_count: int, target_chunk_tokens: int) -> bool:
+        sentence_hash = int.from_bytes(hashlib.blake2b(sentence.strip().encode('utf-8'), digest_size=8).digest())
+        return sentence_hash % target_chunk_tokens < sentence_token_count
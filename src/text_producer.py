@@ -1,3 +1,8 @@
+import hashlib
+import os
+import time
+import uuid
+
 import aiofiles
 import aiohttp
 from bs4 import BeautifulSoup
@@ -17,6 +22,55 @@ class FromWebScraperSource(TextSource):
         return await self.web_scraper.scrape_page(url)
 
 
+class FromCrawlFrontierSource(TextSource):
+    def __init__(self, web_scraper, frontier):
+        self.web_scraper = web_scraper
+        self.frontier = frontier
+
+    async def get_text(self, url: str) -> str:
+        try:
+            text, links = await self.web_scraper.scrape_page_with_links(url)
+        except BaseException:
+            self.frontier.mark_fetched(url, succeeded=False)
+            raise
+        self.frontier.add_links(url, links)
+        return text
+
+
+class CachedTextSource(TextSource):
+    def __init__(self, text_source: TextSource, cache_dir: str, ttl_seconds: float | None = None):
+        self.text_source = text_source
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+
+    async def get_text(self, place: str) -> str:
+        cache_path = self.cache_path(place)
+        if self.is_cached(place):
+            try:
+                async with aiofiles.open(cache_path, mode='r', encoding='utf-8') as f:
+                    return await f.read()
+            except FileNotFoundError:
+                pass
+
+        text = await self.text_source.get_text(place)
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        async with aiofiles.open(tmp_path, mode='w', encoding='utf-8') as f:
+            await f.write(text)
+        os.replace(tmp_path, cache_path)
+        return text
+
+    def is_cached(self, place: str) -> bool:
+        try:
+            modified = os.path.getmtime(self.cache_path(place))
+        except OSError:
+            return False
+        return not self.ttl_seconds or time.time() - modified < self.ttl_seconds
+
+    def cache_path(self, place: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(place.encode('utf-8')).hexdigest() + '.txt')
+
+
 class FromNLFileSource(TextSource):
     async def get_text(self, file_path) -> str:
         async with aiofiles.open(file_path, mode='r', encoding='utf-8') as f:
@@ -31,6 +85,11 @@ class WebScraper:
 
     @staticmethod
     async def scrape_page(url) -> str:
+        text, _ = await WebScraper.scrape_page_with_links(url)
+        return text
+
+    @staticmethod
+    async def scrape_page_with_links(url) -> tuple[str, list[str]]:
         async with aiohttp.ClientSession() as session:
             page = await WebScraper.fetch(session, url)
             soup = BeautifulSoup(page, 'html.parser')
@@ -38,7 +97,8 @@ class WebScraper:
             for element in soup(['nav', 'footer', 'aside', 'header']):
                 element.decompose()
 
+            links = [anchor['href'] for anchor in soup.find_all('a', href=True)]
             text = soup.get_text()
             text = '\n'.join([line.strip() for line in text.splitlines() if line.strip()])
 
-            return text
+            return text, links
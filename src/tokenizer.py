@@ -0,0 +1,61 @@
+import argparse
+import logging
+import os
+import threading
+import time
+
+from src.config import ChatGptClientConfig, configure_logging, get_yaml_configs
+
+logger = logging.getLogger("app_logger")
+
+TIKTOKEN_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'resources', 'tiktoken_cache')
+FALLBACK_ENCODING = 'o200k_base'
+
+_lock = threading.Lock()
+_encodings = {}
+
+
+def use_bundled_cache():
+    if not os.path.isdir(TIKTOKEN_CACHE_DIR):
+        return
+    if os.access(TIKTOKEN_CACHE_DIR, os.W_OK) or \
+            any(not name.startswith('.') for name in os.listdir(TIKTOKEN_CACHE_DIR)):
+        os.environ.setdefault('TIKTOKEN_CACHE_DIR', TIKTOKEN_CACHE_DIR)
+
+
+def encoding_for_model(model: str):
+    with _lock:
+        encoding = _encodings.get(model)
+        if encoding is None:
+            use_bundled_cache()
+            started = time.perf_counter()
+            import tiktoken
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                logger.warning(f"tiktoken has no tokenizer for {model}, "
+                               f"token counts use the {FALLBACK_ENCODING} encoding instead")
+                encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+            _encodings[model] = encoding
+            logger.info(f"Loaded the {encoding.name} encoding for {model} in "
+                        f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        return encoding
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download the tiktoken encoding of the configured model into resources/tiktoken_cache, "
+                    "so it is bundled with the build instead of being fetched on first start.")
+    parser.add_argument('models', nargs='*', help="defaults to the model in application.yaml")
+    args = parser.parse_args()
+
+    configs = get_yaml_configs()
+    configure_logging(configs['logging'])
+    os.makedirs(TIKTOKEN_CACHE_DIR, exist_ok=True)
+    os.environ['TIKTOKEN_CACHE_DIR'] = TIKTOKEN_CACHE_DIR
+    for model in args.models or [ChatGptClientConfig.from_yaml(configs['openai']).model]:
+        print(f"{model}: {encoding_for_model(model).name} cached in {TIKTOKEN_CACHE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import datetime
+import logging
+import os
+
+from owlready2 import DataPropertyClass, ObjectPropertyClass, Ontology, Thing, ThingClass
+
+from src.config import OntologyStoreConfig, configure_logging, get_yaml_configs
+from src.records import ExtractionResult, entity, relation, data_value
+from src.repository.ontology_owlready2_repository import OntologyOwlready2Repository
+from src.repository.ontology_store import OntologyStore
+from src.repository.triple_log_repository import RDF_TYPE, RDFS_LABEL, SEGMENT_SUFFIX, PARTIAL_SEGMENT_SUFFIX, \
+    decode_name, parse_quad
+from src.result_aggregator import DocumentResultAggregator
+
+logger = logging.getLogger("app_logger")
+
+_VALUE_PARSERS = {
+    int: int,
+    float: float,
+    bool: lambda value: {'true': True, '1': True, 'false': False, '0': False}[value.strip().lower()],
+    datetime.date: datetime.date.fromisoformat,
+    datetime.datetime: datetime.datetime.fromisoformat,
+}
+
+
+class MergeReport:
+    def __init__(self):
+        self.segments = 0
+        self.records = 0
+        self.individuals = 0
+        self.object_properties = 0
+        self.data_properties = 0
+        self.rejected = 0
+
+    def describe(self) -> str:
+        return (f"Merged {self.segments} segments, {self.records} records: {self.individuals} individuals, "
+                f"{self.object_properties} object properties, {self.data_properties} data properties, "
+                f"{self.rejected} rejected")
+
+
+class TripleLogMerger:
+    def __init__(self, onto: Ontology):
+        self.__onto = onto
+        self.__base_iri = onto.base_iri
+        self.__types = {}
+        self.__labels = {}
+        self.__object_properties = {}
+        self.__data_properties = {}
+
+    def read_segment(self, path: str, report: MergeReport):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                report.records += 1
+                if not self.__read_record(line):
+                    report.rejected += 1
+                    logger.error(f"Rejected triple log record in {path}: {line.strip()}")
+
+    def collection(self, report: MergeReport) -> ExtractionResult | None:
+        aggregator = DocumentResultAggregator()
+        entities = []
+        for name, class_names in self.__types.items():
+            for class_name in class_names:
+                entities.append(entity(class_name, name, sorted(self.__labels.get(name, ()))))
+                report.individuals += 1
+
+        relations = []
+        for property_name, pairs in self.__object_properties.items():
+            for subject_name, object_name in pairs:
+                if self.__is_known(subject_name) and self.__is_known(object_name):
+                    relations.append(relation(property_name, subject_name, object_name))
+                    report.object_properties += 1
+                else:
+                    report.rejected += 1
+                    logger.error(f"Rejected '{property_name}' between unknown individuals "
+                                 f"'{subject_name}' and '{object_name}'.")
+
+        data_values = []
+        for property_name, pairs in self.__data_properties.items():
+            for object_name, value in pairs:
+                if self.__is_known(object_name):
+                    data_values.append(data_value(property_name, object_name, value))
+                    report.data_properties += 1
+                else:
+                    report.rejected += 1
+                    logger.error(f"Rejected '{property_name}' of unknown individual '{object_name}'.")
+
+        aggregator.add(ExtractionResult(tuple(entities), tuple(relations), tuple(data_values)))
+        return aggregator.result()
+
+    def __is_known(self, name: str) -> bool:
+        return name in self.__types or isinstance(self.__onto[name], Thing)
+
+    def __read_record(self, line: str) -> bool:
+        quad = parse_quad(line)
+        if quad is None:
+            return False
+        subject_iri, predicate_iri, object_iri, literal, lang, _ = quad
+        subject_name = decode_name(self.__base_iri, subject_iri)
+        if subject_name is None:
+            return False
+
+        if predicate_iri == RDF_TYPE:
+            class_name = decode_name(self.__base_iri, object_iri or '')
+            if not isinstance(getattr(self.__onto, class_name or '', None), ThingClass):
+                return False
+            self.__types.setdefault(subject_name, set()).add(class_name)
+            return True
+        if predicate_iri == RDFS_LABEL:
+            if literal is None:
+                return False
+            self.__labels.setdefault(subject_name, set()).add((literal, lang or ''))
+            return True
+
+        property_name = decode_name(self.__base_iri, predicate_iri)
+        prop = getattr(self.__onto, property_name or '', None)
+        if object_iri is not None:
+            object_name = decode_name(self.__base_iri, object_iri)
+            if not isinstance(prop, ObjectPropertyClass) or object_name is None:
+                return False
+            self.__object_properties.setdefault(property_name, set()).add((subject_name, object_name))
+            return True
+
+        if not isinstance(prop, DataPropertyClass):
+            return False
+        value = TripleLogMerger.__parse_value(prop, literal)
+        if value is None:
+            return False
+        self.__data_properties.setdefault(property_name, set()).add((subject_name, value))
+        return True
+
+    @staticmethod
+    def __parse_value(prop, literal: str):
+        if not prop.range:
+            return literal
+        for range_type in prop.range:
+            parser = _VALUE_PARSERS.get(range_type)
+            if parser is None:
+                return literal
+            try:
+                return parser(literal)
+            except (ValueError, KeyError):
+                continue
+        return None
+
+
+def find_segments(log_dir: str, include_partial: bool) -> list:
+    suffixes = (SEGMENT_SUFFIX, PARTIAL_SEGMENT_SUFFIX) if include_partial else (SEGMENT_SUFFIX,)
+    return sorted(os.path.join(log_dir, name) for name in os.listdir(log_dir) if name.endswith(suffixes))
+
+
+def merge_triple_log(log_dir: str, onto: Ontology, save_path: str, ontology_store: OntologyStore,
+                     include_partial=False, keep_segments=False) -> MergeReport:
+    report = MergeReport()
+    merger = TripleLogMerger(onto)
+    segments = find_segments(log_dir, include_partial)
+    for segment in segments:
+        merger.read_segment(segment, report)
+        report.segments += 1
+
+    collection = merger.collection(report)
+    if collection is not None:
+        repository = OntologyOwlready2Repository(onto, save_path, ontology_store)
+        repository.add_individuals(collection)
+        if ontology_store.is_quadstore_backed(onto):
+            repository.export()
+
+    if not keep_segments:
+        merged_dir = os.path.join(log_dir, 'merged')
+        os.makedirs(merged_dir, exist_ok=True)
+        for segment in segments:
+            os.replace(segment, os.path.join(merged_dir, os.path.basename(segment)))
+
+    logger.info(report.describe())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge triple log segments into an ontology in one pass.")
+    parser.add_argument('log_dir')
+    parser.add_argument('ontology_path')
+    parser.add_argument('save_ontology_path')
+    parser.add_argument('--include-partial', action='store_true',
+                        help="also merge segments of runs that have not finished")
+    parser.add_argument('--keep-segments', action='store_true',
+                        help="do not move merged segments to <log_dir>/merged")
+    args = parser.parse_args()
+
+    configs = get_yaml_configs()
+    configure_logging(configs['logging'])
+    ontology_store = OntologyStore(OntologyStoreConfig.from_yaml(configs['ontology_store']))
+    onto = ontology_store.load(args.ontology_path)
+    report = merge_triple_log(args.log_dir, onto, args.save_ontology_path, ontology_store,
+                              args.include_partial, args.keep_segments)
+    print(report.describe())
+
+
+if __name__ == "__main__":
+    main()
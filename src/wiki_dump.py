@@ -0,0 +1,312 @@
+import asyncio
+import bz2
+import contextlib
+import html
+import logging
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from src.config import WikiDumpConfig
+from src.gui.state_manager import global_state_manager
+from src.text_producer import TextSource
+
+logger = logging.getLogger("app_logger")
+
+_READ_SIZE = 1 << 16
+_FILE_NAMESPACE = 6
+_CATEGORY_NAMESPACE = 14
+_CANONICAL_PREFIXES = {_FILE_NAMESPACE: ['File', 'Image', 'Media'], _CATEGORY_NAMESPACE: ['Category']}
+
+_SITE_NAMESPACE = re.compile(r'<namespace key="(-?\d+)"[^>]*?(?:/>|>([^<]*)</namespace>)')
+_COMMENT = re.compile(r'<!--.*?-->', re.S)
+_REF = re.compile(r'<ref[^>]*/>|<ref[^>]*>.*?</ref>', re.S | re.I)
+_DROPPED_ELEMENT = re.compile(r'<(math|gallery|timeline|syntaxhighlight|source|score|chem|imagemap)\b[^>]*>.*?</\1>',
+                              re.S | re.I)
+_TEMPLATE = re.compile(r'\{\{[^{}]*\}\}')
+_TABLE = re.compile(r'\{\|(?:(?!\{\|).)*?\|\}', re.S)
+_LINK = re.compile(r'\[\[([^\[\]]*)\]\]')
+_EXTERNAL_LINK = re.compile(r'\[(?:https?:)?//[^\s\]]+ ?([^\]]*)\]')
+_HTML_TAG = re.compile(r'</?[a-zA-Z][^>]*>')
+_EMPHASIS = re.compile(r"'{2,}")
+_HEADING = re.compile(r'^=+\s*(.*?)\s*=+\s*$', re.M)
+_LIST_MARKER = re.compile(r'^[*#:;]+\s*', re.M)
+_MAGIC_WORD = re.compile(r'__[A-Z]+__')
+_SPACES = re.compile(r'[ \t]+')
+_BLANK_LINES = re.compile(r'\n\s*\n+')
+
+_worker_page_filter = None
+
+
+def normalize_title(title: str) -> str:
+    title = ' '.join(title.replace('_', ' ').split())
+    return title[:1].upper() + title[1:]
+
+
+def read_site_namespaces(dump_path: str) -> dict:
+    header = []
+    with bz2.open(dump_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            header.append(line)
+            if '</siteinfo>' in line or '<page>' in line:
+                break
+    return {int(key): html.unescape(name) for key, name in _SITE_NAMESPACE.findall(''.join(header)) if name}
+
+
+def read_stream_offsets(index_path: str, titles: set | None = None) -> list:
+    offsets = []
+    with bz2.open(index_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            offset, _, title = line.rstrip('\n').split(':', 2)
+            offset = int(offset)
+            if offsets and offsets[-1] == offset:
+                continue
+            if titles is None or normalize_title(title) in titles:
+                offsets.append(offset)
+    return offsets
+
+
+def multistream_index_path(dump_path: str) -> str | None:
+    if not dump_path.endswith('.xml.bz2'):
+        return None
+    index_path = dump_path[:-len('.xml.bz2')] + '-index.txt.bz2'
+    return index_path if os.path.exists(index_path) else None
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+def _page_fields(page) -> tuple:
+    title, namespace, redirect, wikitext = None, None, False, ''
+    for child in page:
+        tag = _local_name(child.tag)
+        if tag == 'title':
+            title = child.text
+        elif tag == 'ns':
+            namespace = int(child.text)
+        elif tag == 'redirect':
+            redirect = True
+        elif tag == 'revision':
+            for field in child:
+                if _local_name(field.tag) == 'text':
+                    wikitext = field.text or ''
+    return title, namespace, redirect, wikitext
+
+
+class WikitextStripper:
+    def __init__(self, file_prefixes: list, category_prefixes: list):
+        self.__dropped_prefixes = {prefix.casefold() for prefix in file_prefixes + category_prefixes}
+        self.__category = re.compile(r'\[\[\s*(?:%s)\s*:\s*([^\]|]+)' % '|'.join(map(re.escape, category_prefixes)),
+                                     re.I)
+
+    def categories(self, wikitext: str) -> set:
+        return {normalize_title(category) for category in self.__category.findall(wikitext)}
+
+    def strip(self, wikitext: str) -> str:
+        text = _COMMENT.sub('', wikitext)
+        text = _REF.sub('', text)
+        text = _DROPPED_ELEMENT.sub('', text)
+        text = WikitextStripper.__remove_nested(_TEMPLATE, text)
+        text = WikitextStripper.__remove_nested(_TABLE, text)
+        replaced = 1
+        while replaced:
+            text, replaced = _LINK.subn(self.__replace_link, text)
+        text = _EXTERNAL_LINK.sub(r'\1', text)
+        text = _HTML_TAG.sub('', text)
+        text = _EMPHASIS.sub('', text)
+        text = _HEADING.sub(r'\1', text)
+        text = _LIST_MARKER.sub('', text)
+        text = _MAGIC_WORD.sub('', text)
+        text = _SPACES.sub(' ', html.unescape(text))
+        return _BLANK_LINES.sub('\n', text).strip()
+
+    def __replace_link(self, match) -> str:
+        target, _, label = match.group(1).partition('|')
+        target = target.strip()
+        prefix, colon, _ = target.partition(':')
+        if colon and not target.startswith(':') and prefix.strip().casefold() in self.__dropped_prefixes:
+            return ''
+        return label or target.lstrip(':')
+
+    @staticmethod
+    def __remove_nested(pattern, text: str) -> str:
+        replaced = 1
+        while replaced:
+            text, replaced = pattern.subn('', text)
+        return text
+
+
+class WikiPageFilter:
+    def __init__(self, config: WikiDumpConfig, site_namespaces: dict, titles: set | None):
+        self.titles = titles
+        self.__namespaces = set(config.namespaces)
+        self.__skip_redirects = config.skip_redirects
+        self.__min_text_chars = config.min_text_chars
+        self.__categories = {normalize_title(category) for category in config.categories}
+        prefixes = {key: list(names) for key, names in _CANONICAL_PREFIXES.items()}
+        for key in prefixes:
+            if site_namespaces.get(key):
+                prefixes[key].append(site_namespaces[key])
+        self.__stripper = WikitextStripper(prefixes[_FILE_NAMESPACE], prefixes[_CATEGORY_NAMESPACE])
+
+    def wants(self, title: str, namespace: int, redirect: bool) -> bool:
+        if self.__namespaces and namespace not in self.__namespaces:
+            return False
+        if redirect and self.__skip_redirects:
+            return False
+        return self.titles is None or normalize_title(title) in self.titles
+
+    def convert(self, pages: list) -> list:
+        converted = []
+        for title, wikitext in pages:
+            if self.__categories and not self.__categories & self.__stripper.categories(wikitext):
+                continue
+            text = self.__stripper.strip(wikitext)
+            if len(text) >= self.__min_text_chars:
+                converted.append((title, text))
+        return converted
+
+
+def iterate_page_batches(dump_path: str, page_filter: WikiPageFilter, batch_pages: int):
+    with bz2.open(dump_path, 'rb') as f:
+        context = ElementTree.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        batch = []
+        for event, element in context:
+            if event != 'end' or _local_name(element.tag) != 'page':
+                continue
+            title, namespace, redirect, wikitext = _page_fields(element)
+            root.clear()
+            if page_filter.wants(title, namespace, redirect):
+                batch.append((title, wikitext))
+                if len(batch) >= batch_pages:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+
+def _init_worker(page_filter: WikiPageFilter):
+    global _worker_page_filter
+    _worker_page_filter = page_filter
+
+
+def _convert_pages(pages: list) -> list:
+    return _worker_page_filter.convert(pages)
+
+
+def _read_stream(dump_path: str, offset: int) -> list:
+    decompressor = bz2.BZ2Decompressor()
+    parts = []
+    with open(dump_path, 'rb') as f:
+        f.seek(offset)
+        while not decompressor.eof:
+            data = f.read(_READ_SIZE)
+            if not data:
+                break
+            parts.append(decompressor.decompress(data))
+    root = ElementTree.fromstring(b'<pages>' + b''.join(parts) + b'</pages>')
+    pages = []
+    for page in root.iter('page'):
+        title, namespace, redirect, wikitext = _page_fields(page)
+        if _worker_page_filter.wants(title, namespace, redirect):
+            pages.append((title, wikitext))
+    return _worker_page_filter.convert(pages)
+
+
+class WikiDumpSource(TextSource):
+    def __init__(self, config: WikiDumpConfig, dump_paths):
+        self.__config = config
+        self.__dump_paths = dump_paths
+        self.__titles = WikiDumpSource.__read_titles(config.titles_file) if config.titles_file else None
+        self.__pages = asyncio.Queue(maxsize=config.buffer_pages)
+        self.__texts = {}
+        self.__producer = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        if self.__producer is None:
+            self.__producer = asyncio.create_task(self.__produce())
+        page = await self.__pages.get()
+        if page is None:
+            self.__pages.put_nowait(None)
+            raise StopAsyncIteration
+        title, text = page
+        self.__texts.setdefault(title, deque()).append(text)
+        return title
+
+    async def get_text(self, title: str) -> str:
+        texts = self.__texts[title]
+        text = texts.popleft()
+        if not texts:
+            del self.__texts[title]
+        return text
+
+    async def close(self):
+        if self.__producer is not None and not self.__producer.done():
+            self.__producer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.__producer
+
+    async def __produce(self):
+        try:
+            async for dump_path in self.__dump_paths:
+                try:
+                    pages = await self.__read_dump(dump_path)
+                    logger.info(f"Read {pages} pages from {dump_path}")
+                except Exception:
+                    message = "Could not read the wiki dump " + dump_path
+                    logger.error(message, exc_info=True)
+                    global_state_manager.trigger_callback("update_errors_tab", message)
+        except Exception:
+            logger.error("Could not read the wiki dump paths", exc_info=True)
+        await self.__pages.put(None)
+
+    async def __read_dump(self, dump_path: str) -> int:
+        loop = asyncio.get_running_loop()
+        site_namespaces = await asyncio.to_thread(read_site_namespaces, dump_path)
+        page_filter = WikiPageFilter(self.__config, site_namespaces, self.__titles)
+        workers = self.__config.workers or os.cpu_count()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(page_filter,))
+        in_flight = deque()
+        pages = 0
+        try:
+            async for function, args in self.__jobs(dump_path, page_filter):
+                in_flight.append(loop.run_in_executor(executor, function, *args))
+                if len(in_flight) >= workers * 2:
+                    pages += await self.__deliver(await in_flight.popleft())
+            while in_flight:
+                pages += await self.__deliver(await in_flight.popleft())
+        finally:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+        return pages
+
+    async def __jobs(self, dump_path: str, page_filter: WikiPageFilter):
+        index_path = multistream_index_path(dump_path) if self.__config.use_multistream_index else None
+        if index_path is not None:
+            offsets = await asyncio.to_thread(read_stream_offsets, index_path, page_filter.titles)
+            logger.info(f"Reading {len(offsets)} streams of {dump_path} through {index_path}")
+            for offset in offsets:
+                yield _read_stream, (dump_path, offset)
+            return
+
+        batches = iterate_page_batches(dump_path, page_filter, self.__config.batch_pages)
+        while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+            yield _convert_pages, (batch,)
+
+    async def __deliver(self, pages: list) -> int:
+        for page in pages:
+            await self.__pages.put(page)
+        return len(pages)
+
+    @staticmethod
+    def __read_titles(titles_file: str) -> set:
+        with open(titles_file, 'r', encoding='utf-8') as f:
+            return {normalize_title(line) for line in f if line.strip()}
@@ -0,0 +1,222 @@
+import asyncio
+import contextlib
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Protocol
+
+from src.config import WorkQueueConfig
+
+logger = logging.getLogger("app_logger")
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+
+class WorkItem:
+    __slots__ = ('id', 'place', 'attempts', 'lease_token')
+
+    def __init__(self, item_id: int, place: str, attempts: int, lease_token: str):
+        self.id = item_id
+        self.place = place
+        self.attempts = attempts
+        self.lease_token = lease_token
+
+
+class WorkQueue(Protocol):
+    def enqueue(self, places) -> int:
+        ...
+
+    def claim(self, worker_id: str, lease_seconds: float) -> WorkItem | None:
+        ...
+
+    def heartbeat(self, item: WorkItem, lease_seconds: float) -> bool:
+        ...
+
+    def complete(self, item: WorkItem) -> bool:
+        ...
+
+    def fail(self, item: WorkItem, error: str) -> bool:
+        ...
+
+    def release(self, item: WorkItem) -> bool:
+        ...
+
+    def has_unfinished(self, other_than_worker_id: str) -> bool:
+        ...
+
+    def stats(self) -> dict:
+        ...
+
+
+class SqliteWorkQueue(WorkQueue):
+    def __init__(self, path: str, max_attempts: int):
+        if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+            raise RuntimeError(f"The work queue needs SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} or newer for "
+                               f"UPDATE ... RETURNING, this Python is linked against SQLite {sqlite3.sqlite_version}")
+        self.__path = path
+        self.__max_attempts = max_attempts
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(path, timeout=30)
+        try:
+            connection.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            connection.close()
+        logger.warning(f"Work queue {path} uses SQLite file locks, workers on other hosts are only safe on a "
+                       f"filesystem with working POSIX locks, which NFS mounts often lack")
+        with self.__connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS work_items ("
+                "id INTEGER PRIMARY KEY, place TEXT NOT NULL UNIQUE, state TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, lease_owner TEXT, lease_token TEXT, lease_expires REAL, "
+                "last_error TEXT, updated REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS work_items_state ON work_items (state, lease_expires)")
+
+    def enqueue(self, places) -> int:
+        now = time.time()
+        with self.__connect() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO work_items (place, state, updated) VALUES (?, ?, ?)",
+                ((place, PENDING, now) for place in places))
+            return connection.total_changes - before
+
+    def claim(self, worker_id: str, lease_seconds: float) -> WorkItem | None:
+        now = time.time()
+        lease_token = uuid.uuid4().hex
+        with self.__connect() as connection:
+            connection.execute(
+                "UPDATE work_items SET state = ?, lease_owner = NULL, lease_token = NULL, lease_expires = NULL, "
+                "last_error = COALESCE(last_error, 'lease expired'), updated = ? "
+                "WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, now, LEASED, now, self.__max_attempts))
+            row = connection.execute(
+                "UPDATE work_items SET state = ?, lease_owner = ?, lease_token = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated = ? "
+                "WHERE id = (SELECT id FROM work_items WHERE state = ? OR (state = ? AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1) "
+                "RETURNING id, place, attempts",
+                (LEASED, worker_id, lease_token, now + lease_seconds, now, PENDING, LEASED, now)).fetchone()
+        if row is None:
+            return None
+        return WorkItem(row[0], row[1], row[2], lease_token)
+
+    def heartbeat(self, item: WorkItem, lease_seconds: float) -> bool:
+        now = time.time()
+        return self.__update_leased(item, "lease_expires = ?, updated = ?", (now + lease_seconds, now))
+
+    def complete(self, item: WorkItem) -> bool:
+        return self.__update_leased(
+            item, "state = ?, lease_owner = NULL, lease_token = NULL, lease_expires = NULL, updated = ?",
+            (DONE, time.time()))
+
+    def fail(self, item: WorkItem, error: str) -> bool:
+        state = FAILED if item.attempts >= self.__max_attempts else PENDING
+        return self.__update_leased(
+            item, "state = ?, lease_owner = NULL, lease_token = NULL, lease_expires = NULL, last_error = ?, "
+                  "updated = ?",
+            (state, error, time.time()))
+
+    def release(self, item: WorkItem) -> bool:
+        return self.__update_leased(
+            item, "state = ?, lease_owner = NULL, lease_token = NULL, lease_expires = NULL, "
+                  "attempts = attempts - 1, updated = ?",
+            (PENDING, time.time()))
+
+    def has_unfinished(self, other_than_worker_id: str) -> bool:
+        with self.__connect() as connection:
+            return connection.execute(
+                "SELECT 1 FROM work_items WHERE state = ? OR (state = ? AND lease_owner != ?) LIMIT 1",
+                (PENDING, LEASED, other_than_worker_id)).fetchone() is not None
+
+    def stats(self) -> dict:
+        with self.__connect() as connection:
+            counts = dict(connection.execute("SELECT state, COUNT(*) FROM work_items GROUP BY state").fetchall())
+        return {state: counts.get(state, 0) for state in (PENDING, LEASED, DONE, FAILED)}
+
+    def requeue_failed(self) -> int:
+        with self.__connect() as connection:
+            return connection.execute(
+                "UPDATE work_items SET state = ?, attempts = 0, updated = ? WHERE state = ?",
+                (PENDING, time.time(), FAILED)).rowcount
+
+    def __update_leased(self, item: WorkItem, assignments: str, parameters: tuple) -> bool:
+        with self.__connect() as connection:
+            updated = connection.execute(
+                f"UPDATE work_items SET {assignments} WHERE id = ? AND state = ? AND lease_token = ?",
+                parameters + (item.id, LEASED, item.lease_token)).rowcount
+        if not updated:
+            logger.error(f"Lease on '{item.place}' was lost before it could be updated.")
+        return bool(updated)
+
+    @contextlib.contextmanager
+    def __connect(self):
+        connection = sqlite3.connect(self.__path, timeout=30, isolation_level=None)
+        try:
+            connection.execute("PRAGMA busy_timeout = 30000")
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+
+class WorkQueuePlaceSource:
+    def __init__(self, work_queue: WorkQueue, config: WorkQueueConfig, worker_id: str | None = None):
+        self.__work_queue = work_queue
+        self.__config = config
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.__leased = {}
+        self.__heartbeat_task = None
+
+    async def places(self):
+        self.__heartbeat_task = asyncio.create_task(self.__heartbeat())
+        try:
+            while True:
+                item = await asyncio.to_thread(self.__work_queue.claim, self.worker_id, self.__config.lease_seconds)
+                if item is None:
+                    if not await asyncio.to_thread(self.__work_queue.has_unfinished, self.worker_id):
+                        return
+                    await asyncio.sleep(self.__config.poll_seconds)
+                    continue
+                self.__leased[item.place] = item
+                yield item.place
+        finally:
+            self.__heartbeat_task.cancel()
+
+    async def place_finished(self, place: str, succeeded: bool):
+        item = self.__leased.pop(place, None)
+        if item is None:
+            return
+        if succeeded:
+            await asyncio.to_thread(self.__work_queue.complete, item)
+        else:
+            await asyncio.to_thread(self.__work_queue.fail, item, "processing failed")
+            logger.info(f"Place '{place}' failed on attempt {item.attempts}")
+
+    async def release_all(self):
+        if self.__heartbeat_task is not None:
+            self.__heartbeat_task.cancel()
+        items = list(self.__leased.values())
+        self.__leased.clear()
+        for item in items:
+            await asyncio.to_thread(self.__work_queue.release, item)
+
+    async def __heartbeat(self):
+        while True:
+            await asyncio.sleep(self.__config.heartbeat_seconds)
+            for place, item in list(self.__leased.items()):
+                if not await asyncio.to_thread(self.__work_queue.heartbeat, item, self.__config.lease_seconds):
+                    self.__leased.pop(place, None)